@@ -0,0 +1,64 @@
+"""
+Benchmark the generation of the masked G-gate output vector in the FLPCP queries.
+
+The baseline is the previous construction, which sums mask * i ** j over every G-gate i and proof coefficient j. It is
+compared against the query engine of the validators, which computes the same vector as weighted power sums from the
+query template. Run from the `pear` directory with `python -m benchmarks.bench_query_gen`.
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from src.flpcp import BinaryValidation, RangeValidation
+
+
+def power_table_c_gen(field_size: int, masks: List[int], proof_size: int) -> List[int]:
+    """Compute the masked G-gate output vector with the i ** j power table, which is the baseline."""
+    queries = [[mask * i ** j for j in range(proof_size)] for i, mask in enumerate(masks, start=1)]
+    return [sum(col) % field_size for col in zip(*queries)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--degree", type=int, default=2, help="The degree of RangeValidation, 2 uses BinaryValidation.")
+    parser.add_argument("--skip-baseline-above", type=int, default=400)
+    args = parser.parse_args()
+
+    field_size = 2 ** 127 - 1
+    print(f"{'input_size':>10} {'proof_size':>10} {'baseline (s)':>13} {'engine (s)':>11} {'template (s)':>13}")
+
+    for input_size in args.sizes:
+        # Build the validator, which includes building its query template.
+        start = time.perf_counter()
+        if args.degree == 2:
+            validator = BinaryValidation(field_size=field_size, input_size=input_size, backend="numpy")
+        else:
+            # Fix the product gate, such that the degree is the given one and each input has one G-gate.
+            validator = RangeValidation(
+                field_size=field_size, input_size=input_size, lower=0, upper=args.degree - 1, backend="numpy",
+                strategy="product"
+            )
+        template_time = time.perf_counter() - start
+
+        # Time the masked G-gate outputs of the query engine.
+        masks = [random.randrange(1, field_size) for _ in range(input_size)]
+        start = time.perf_counter()
+        c_vec = validator._query_c_gen(masks)
+        engine_time = time.perf_counter() - start
+
+        # Time the baseline and check that both agree.
+        proof_size = validator._proof_size
+        baseline = "skipped"
+        if input_size <= args.skip_baseline_above:
+            start = time.perf_counter()
+            expected = power_table_c_gen(field_size, masks, proof_size)
+            baseline = f"{time.perf_counter() - start:.4f}"
+            assert list(c_vec[-proof_size:]) == expected
+
+        print(f"{input_size:>10} {proof_size:>10} {baseline:>13} {engine_time:>11.4f} {template_time:>13.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark the FLPCP validators and IPFE across input sizes, and compare the results of two runs.
+
+The `run` command sweeps the input size, the degree of RangeValidation, the bounds of NormBoundValidation and the
+security parameter of IPFE. Each operation is timed as the best of several repetitions, and its peak memory is measured
+by tracemalloc in a separate run, since tracing slows down the allocations. The serialized sizes of the proofs, queries
+and ciphertexts are recorded as well, and all results are written to a JSON file.
+
+The `compare` command matches the records of two such files and reports every operation that became slower or larger
+than a threshold, it exits with status 1 if there is any regression. Run from the `pear` directory, for example
+`python -m benchmarks.bench_suite run --output new.json` then
+`python -m benchmarks.bench_suite compare old.json new.json`.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from math import isqrt
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.flpcp import BinaryValidation, NormBoundValidation, RangeValidation
+from src.flpcp.base import FLPCP, Message
+from src.flpcp.serialization import dump_proof, dump_query
+from src.ipfe.form_array import FormArray
+from src.ipfe.ipfe import decrypt, encrypt, keygen, param_gen
+
+# The field size of the FLPCP benchmarks.
+FIELD_SIZE = 2 ** 127 - 1
+
+
+@dataclass
+class Record:
+    """The measurement of one operation with one set of parameters."""
+    benchmark: str
+    operation: str
+    params: Dict[str, Any]
+    seconds: float
+    peak_bytes: int
+    size_bytes: Optional[int] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        """Return the key matching the same measurement across runs."""
+        return self.benchmark, self.operation, json.dumps(self.params, sort_keys=True)
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Tuple[Any, float, int]:
+    """
+    Measure the wall time and the peak memory of a function.
+
+    :param fn: The function to call without arguments.
+    :param repeat: The number of timed calls, the best time is kept.
+    :return: The result of the last call, the best time in seconds and the peak of traced memory in bytes.
+    """
+    # Time the calls without tracing the memory.
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    # Trace the memory of one more call.
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_validator(name: str, params: Dict[str, Any], validator: FLPCP, message: Message, repeat: int) -> List[Record]:
+    """
+    Benchmark the proof generation, the query generation and the verification of a validator.
+
+    :param name: The name of the benchmark.
+    :param params: The parameters of the validator, which are recorded.
+    :param validator: The validator to benchmark.
+    :param message: A valid input message.
+    :param repeat: The number of timed calls of each operation.
+    :return: The records of the operations.
+    """
+    proof, proof_seconds, proof_peak = measure(lambda: validator.proof_gen(message=message), repeat)
+    query, query_seconds, query_peak = measure(validator.query_gen, repeat)
+    accepted, verify_seconds, verify_peak = measure(lambda: validator.verify(proof=proof, query=query), repeat)
+    if not accepted:
+        raise RuntimeError(f"The proof of {name} with {params} was rejected.")
+
+    return [
+        Record(name, "proof_gen", params, proof_seconds, proof_peak, len(dump_proof(proof, FIELD_SIZE))),
+        Record(name, "query_gen", params, query_seconds, query_peak, len(dump_query(query, FIELD_SIZE))),
+        Record(name, "verify", params, verify_seconds, verify_peak),
+    ]
+
+
+def bench_flpcp(args: argparse.Namespace) -> List[Record]:
+    """Sweep the validators over the input sizes, the degrees and the bounds."""
+    records = []
+    for input_size in args.sizes:
+        params = {"input_size": input_size, "backend": args.backend}
+        validator = BinaryValidation(field_size=FIELD_SIZE, input_size=input_size, backend=args.backend)
+        message = [random.randint(0, 1) for _ in range(input_size)]
+        records += bench_validator("binary", params, validator, message, args.repeat)
+
+        # The range is [0, degree - 1] with the product gate fixed, so the gate has the given degree.
+        for degree in args.degrees:
+            params = {"input_size": input_size, "degree": degree, "strategy": "product", "backend": args.backend}
+            validator = RangeValidation(
+                field_size=FIELD_SIZE, input_size=input_size, lower=0, upper=degree - 1, backend=args.backend,
+                strategy="product"
+            )
+            message = [random.randint(0, degree - 1) for _ in range(input_size)]
+            records += bench_validator("range", params, validator, message, args.repeat)
+
+        # The inputs are sampled small enough for the squared norm to fit in norm_bound bits.
+        for input_bound, norm_bound in args.bounds:
+            params = {"input_size": input_size, "input_bound": input_bound, "norm_bound": norm_bound,
+                      "backend": args.backend}
+            validator = NormBoundValidation(
+                field_size=FIELD_SIZE, input_size=input_size, norm_bound=norm_bound, input_bound=input_bound,
+                backend=args.backend
+            )
+            high = min(2 ** input_bound, isqrt((2 ** norm_bound - 1) // input_size) + 1)
+            message = [random.randrange(high) for _ in range(input_size)]
+            records += bench_validator("norm_bound", params, validator, message, args.repeat)
+
+    return records
+
+
+def bench_ipfe(args: argparse.Namespace) -> List[Record]:
+    """Sweep IPFE over the security parameters and the vector lengths."""
+    records = []
+    for lambda_bits in args.lambda_bits:
+        for length in args.sizes:
+            params = {"lambda_bits": lambda_bits, "mu_bits": args.mu_bits, "length": length}
+            (msk, mpk), param_seconds, param_peak = measure(
+                lambda: param_gen(mu_bits=args.mu_bits, lambda_bits=lambda_bits, length=length), 1
+            )
+
+            # Encrypt and decrypt vectors with small entries, such that the inner product is easy to decode.
+            y_vec = [random.randint(0, 3) for _ in range(length)]
+            x_vec = [random.randint(0, 3) for _ in range(length)]
+            ct, encrypt_seconds, encrypt_peak = measure(lambda: encrypt(mpk=mpk, y_vec=y_vec), args.repeat)
+            sk, keygen_seconds, keygen_peak = measure(lambda: keygen(msk=msk, x_vec=x_vec), args.repeat)
+            value, decrypt_seconds, decrypt_peak = measure(
+                lambda: decrypt(mpk=mpk, sk=sk, ct=ct, x_vec=x_vec), args.repeat
+            )
+            if value != sum(x * y for x, y in zip(x_vec, y_vec)):
+                raise RuntimeError(f"The decryption with {params} is incorrect.")
+
+            ct_size = len(FormArray(mpk.gp.discriminant(), ct).to_bytes())
+            records += [
+                Record("ipfe", "param_gen", params, param_seconds, param_peak),
+                Record("ipfe", "encrypt", params, encrypt_seconds, encrypt_peak, ct_size),
+                Record("ipfe", "keygen", params, keygen_seconds, keygen_peak),
+                Record("ipfe", "decrypt", params, decrypt_seconds, decrypt_peak),
+            ]
+
+    return records
+
+
+def run(args: argparse.Namespace):
+    """Run the selected benchmarks and write the records to a JSON file."""
+    random.seed(args.seed)
+    records = []
+    if "flpcp" in args.suites:
+        records += bench_flpcp(args)
+    if "ipfe" in args.suites:
+        records += bench_ipfe(args)
+
+    for record in records:
+        size = "" if record.size_bytes is None else f"{record.size_bytes:>10}"
+        print(f"{record.benchmark:>10} {record.operation:>9} {record.seconds:>10.4f}s {record.peak_bytes:>12} "
+              f"{size} {record.params}")
+
+    result = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "time": time.time(),
+                 "seed": args.seed, "repeat": args.repeat},
+        "records": [asdict(record) for record in records],
+    }
+    with open(args.output, "w") as file:
+        json.dump(result, file, indent=2)
+
+
+def load_records(path: str) -> Dict[Tuple[str, str, str], Record]:
+    """Load the records of a JSON file written by `run`, keyed by their benchmark, operation and parameters."""
+    with open(path) as file:
+        records = [Record(**record) for record in json.load(file)["records"]]
+    return {record.key: record for record in records}
+
+
+def compare(args: argparse.Namespace):
+    """Compare the records of two runs and exit with status 1 if any operation regressed."""
+    old, new = load_records(args.old), load_records(args.new)
+    regressions = 0
+
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        ratios = {
+            "time": after.seconds / max(before.seconds, 1e-9),
+            "memory": after.peak_bytes / max(before.peak_bytes, 1),
+        }
+        if before.size_bytes and after.size_bytes is not None:
+            ratios["size"] = after.size_bytes / before.size_bytes
+
+        # Flag each ratio above the threshold, sizes are deterministic so any growth is a regression.
+        flagged = [name for name, ratio in ratios.items()
+                   if ratio > (1 if name == "size" else args.threshold)]
+        regressions += bool(flagged)
+        status = "REGRESSION " + ",".join(flagged) if flagged else "ok"
+        print(f"{key[0]:>10} {key[1]:>9} " + " ".join(f"{name} x{ratio:.2f}" for name, ratio in ratios.items())
+              + f" {key[2]} {status}")
+
+    for key in sorted(old.keys() ^ new.keys()):
+        print(f"{key[0]:>10} {key[1]:>9} {key[2]} only in {'old' if key in old else 'new'}")
+
+    print(f"{regressions} regression(s) above x{args.threshold}")
+    sys.exit(1 if regressions else 0)
+
+
+def bounds(value: str) -> Tuple[int, int]:
+    """Parse a pair input_bound:norm_bound."""
+    input_bound, norm_bound = value.split(":")
+    return int(input_bound), int(norm_bound)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write the records to a JSON file.")
+    run_parser.add_argument("--suites", nargs="+", choices=["flpcp", "ipfe"], default=["flpcp", "ipfe"])
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100])
+    run_parser.add_argument("--degrees", type=int, nargs="+", default=[3, 5])
+    run_parser.add_argument("--bounds", type=bounds, nargs="+", default=[(4, 16), (8, 24)],
+                            help="The pairs input_bound:norm_bound of NormBoundValidation.")
+    run_parser.add_argument("--lambda-bits", type=int, nargs="+", default=[40, 80])
+    run_parser.add_argument("--mu-bits", type=int, default=36)
+    run_parser.add_argument("--backend", choices=["sage", "numpy"], default="sage")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON files written by run.")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=1.2,
+                                help="The ratio of time or memory above which an operation regressed.")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import random
+import struct
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import List, Optional
+
+from sage.quadratic_forms.binary_qf import BinaryQF
+
+from src.flpcp.backend import FieldBackend
+from src.flpcp.base import FLPCP, Message, Proof
+from src.flpcp.serialization import dump_proof, load_proof
+from src.ipfe.form_array import FormArray
+from src.ipfe.ipfe import PK, encrypt
+
+# The validator and public key of a worker process, which are set once by the initializer.
+_worker_validator: Optional[FLPCP] = None
+_worker_mpk: Optional[PK] = None
+
+
+@dataclass
+class ClientBundle:
+    """The submission of one client, the FLPCP proof on its input and the IPFE ciphertext of its input."""
+    proof: Proof
+    ciphertext: List[BinaryQF]
+
+    def to_bytes(self, field_size: int) -> bytes:
+        """
+        Serialize the bundle, the proof in the FLPCP wire format and the ciphertext as a FormArray.
+
+        :param field_size: The prime field size of the proof.
+        :return: The serialized bytes.
+        """
+        proof = dump_proof(self.proof, field_size)
+        ciphertext = FormArray(self.ciphertext[0].discriminant(), self.ciphertext).to_bytes()
+        return struct.pack("<I", len(proof)) + proof + ciphertext
+
+    @classmethod
+    def from_bytes(cls, data: bytes, backend: FieldBackend) -> "ClientBundle":
+        """
+        Load a bundle written by `to_bytes`.
+
+        :param data: The serialized bytes.
+        :param backend: The field backend to store the proof.
+        :return: The bundle.
+        """
+        data = memoryview(data)
+        size = struct.unpack_from("<I", data)[0]
+        proof = load_proof(data[4:4 + size], backend)
+        return cls(proof=proof, ciphertext=FormArray.from_bytes(data[4 + size:]).to_binary_qfs())
+
+
+def _init_worker(validator: FLPCP, mpk: PK):
+    """
+    Store the validator and the public key in a worker process.
+
+    The random generator is reseeded, since forked workers would otherwise share the state of the parent, and the
+    proof constants and the encryption randomness must be independent.
+
+    :param validator: The validator generating the proofs.
+    :param mpk: The public key of the encryption.
+    """
+    global _worker_validator, _worker_mpk
+    random.seed()
+    _worker_validator = validator
+    _worker_mpk = mpk
+
+
+def _prove(validator: FLPCP, message: Message) -> bytes:
+    """
+    Generate the proof of a prepared message.
+
+    :param validator: The validator generating the proof.
+    :param message: The prepared message.
+    :return: The proof serialized by `dump_proof`.
+    """
+    return dump_proof(validator.proof_gen_prepared(message=message), validator.field_size)
+
+
+def _encrypt(mpk: PK, y_vec: List[int]) -> bytes:
+    """
+    Encrypt a vector.
+
+    :param mpk: The public key of the encryption.
+    :param y_vec: The vector to encrypt.
+    :return: The ciphertext serialized as a FormArray.
+    """
+    ciphertext = encrypt(mpk=mpk, y_vec=y_vec)
+    return FormArray(ciphertext[0].discriminant(), ciphertext).to_bytes()
+
+
+def _proof_worker(message: Message) -> bytes:
+    """Generate the serialized proof of a prepared message in a worker process."""
+    return _prove(_worker_validator, message)
+
+
+def _encrypt_worker(y_vec: List[int]) -> bytes:
+    """Encrypt a vector to a serialized ciphertext in a worker process."""
+    return _encrypt(_worker_mpk, y_vec)
+
+
+class ClientPipeline:
+    """
+    The client side of an aggregation round, which proves and encrypts each input vector concurrently.
+
+    Each input is prepared once by the validator, then the proof on the prepared message and the ciphertext of the
+    input are computed at the same time in a pool, so the latency is about the longer of the two. The pool returns
+    the proof and the ciphertext in their wire formats, which are plain bytes, and they are loaded back here.
+    """
+
+    def __init__(self, validator: FLPCP, mpk: PK, use_processes: bool = True):
+        """
+        Start the pool of the pipeline.
+
+        :param validator: The validator generating the proofs, e.g. a NormBoundValidation.
+        :param mpk: The public key of the encryption, with one entry of h per input entry.
+        :param use_processes: If True use two worker processes, otherwise two threads in this process.
+        """
+        self._validator = validator
+
+        # Worker processes receive the validator and the public key once, threads use them directly.
+        self._executor: Executor
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=2, initializer=_init_worker, initargs=(validator, mpk))
+            self._prove, self._encrypt = _proof_worker, _encrypt_worker
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=2)
+            self._prove, self._encrypt = partial(_prove, validator), partial(_encrypt, mpk)
+
+    def submit(self, message: Message) -> ClientBundle:
+        """
+        Prove and encrypt one input vector.
+
+        :param message: A list of integers representing the input message.
+        :return: The bundle of the proof and the ciphertext.
+        """
+        # Prepare the message once for the proof, the ciphertext is of the input entries.
+        prepared = self._validator.prepare_message(message=message)
+
+        proof = self._executor.submit(self._prove, prepared)
+        ciphertext = self._executor.submit(self._encrypt, [int(x) for x in message])
+        return ClientBundle(
+            proof=load_proof(proof.result(), self._validator.backend),
+            ciphertext=FormArray.from_bytes(ciphertext.result()).to_binary_qfs()
+        )
+
+    def close(self):
+        """Shut down the pool."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "ClientPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
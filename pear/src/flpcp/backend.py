@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Type
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Declare some useful types, a vector is a sage vector or a NumPy array depending on the backend.
+Vector = Any
+
+
+class FieldBackend(ABC):
+    """
+    The base class for the storage of FLPCP proofs and queries over GF(p).
+
+    The FLPCP arithmetic is carried out on plain integers modulo p. A backend only decides how proof and query vectors
+    are stored and how their inner products are computed, so the hot paths do not create an object per field element.
+    """
+
+    def __init__(self, field_size: int):
+        """
+        Initialize the backend for a finite field of given size.
+
+        :param field_size: The prime field size to use for all computations. Must be a prime number.
+        """
+        self._field_size = int(field_size)
+
+    @property
+    def field_size(self) -> int:
+        """Return the prime field size of this backend."""
+        return self._field_size
+
+    @abstractmethod
+    def vector(self, values: List[int]) -> Vector:
+        """
+        Create a vector from a list of integers, which are reduced modulo p.
+
+        :param values: A list of integers.
+        :return: The vector in the format of this backend.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def to_list(self, vec: Vector) -> List[int]:
+        """
+        Convert a vector to a list of integers in [0, p).
+
+        :param vec: A vector in the format of this backend.
+        :return: The list of its entries.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def dot(self, u: Vector, v: Vector) -> int:
+        """
+        Compute the inner product of two vectors.
+
+        :param u: A vector in the format of this backend.
+        :param v: A vector in the format of this backend, with the same length as u.
+        :return: The inner product as an integer in [0, p).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def mat_mul(self, rows: List[Vector], cols: List[Vector]) -> List[List[int]]:
+        """
+        Compute the inner products of each vector in rows with each vector in cols.
+
+        :param rows: A list of vectors, e.g. the proofs to verify.
+        :param cols: A list of vectors, e.g. the vectors of a query.
+        :return: A matrix as a list of rows, where entry (i, j) is rows[i] · cols[j] as an integer in [0, p).
+        """
+        raise NotImplementedError
+
+
+class SageBackend(FieldBackend):
+    """The backend that stores vectors as sage vectors over GF(p), this is the default."""
+
+    def __init__(self, field_size: int):
+        """
+        Initialize the backend for a finite field of given size.
+
+        :param field_size: The prime field size to use for all computations. Must be a prime number.
+        """
+        super().__init__(field_size)
+
+        # Sage is imported here, so that the other backends can run without it.
+        from sage.matrix.constructor import matrix
+        from sage.modules.free_module_element import vector
+        from sage.rings.all import ZZ
+        from sage.rings.finite_rings.all import GF
+
+        self._matrix = matrix
+        self._vector = vector
+        self._zz = ZZ
+        self._field = GF(field_size)
+
+    def vector(self, values: List[int]) -> Vector:
+        return self._vector(self._field, values)
+
+    def to_list(self, vec: Vector) -> List[int]:
+        return [int(x) for x in vec]
+
+    def dot(self, u: Vector, v: Vector) -> int:
+        return int(u * v)
+
+    def mat_mul(self, rows: List[Vector], cols: List[Vector]) -> List[List[int]]:
+        # Lift the vectors to the integers, where matrix products are much faster.
+        product = self._matrix(self._zz, rows) * self._matrix(self._zz, cols).transpose()
+        return [[int(x) % self._field_size for x in row] for row in product.rows()]
+
+
+class NumPyBackend(FieldBackend):
+    """The backend that stores vectors as NumPy arrays of Python integers, which does not require sage."""
+
+    def __init__(self, field_size: int):
+        """
+        Initialize the backend for a finite field of given size.
+
+        :param field_size: The prime field size to use for all computations. Must be a prime number.
+        """
+        if np is None:
+            raise ImportError("The numpy backend requires numpy to be installed.")
+
+        super().__init__(field_size)
+
+    def vector(self, values: List[int]) -> Vector:
+        return np.array([int(x) % self._field_size for x in values], dtype=object)
+
+    def to_list(self, vec: Vector) -> List[int]:
+        return [int(x) for x in vec]
+
+    def dot(self, u: Vector, v: Vector) -> int:
+        return int(u.dot(v)) % self._field_size
+
+    def mat_mul(self, rows: List[Vector], cols: List[Vector]) -> List[List[int]]:
+        # The entries are Python integers, so the products are exact before the reduction.
+        product = np.array(rows, dtype=object) @ np.array(cols, dtype=object).T
+        return [[int(x) % self._field_size for x in row] for row in product]
+
+
+# The available backends by name.
+BACKENDS: Dict[str, Type[FieldBackend]] = {"sage": SageBackend, "numpy": NumPyBackend}
+
+
+def get_backend(name: str, field_size: int) -> FieldBackend:
+    """
+    Create a field backend by name.
+
+    :param name: The name of the backend, one of "sage" and "numpy".
+    :param field_size: The prime field size to use for all computations. Must be a prime number.
+    :return: The field backend.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}, expected one of {', '.join(BACKENDS)}.")
+
+    return BACKENDS[name](field_size)
@@ -1,18 +1,27 @@
-from src.flpcp.base import FLPCP, Message, Proof, Query, vector
+from typing import Iterable, List, Optional
+
+from src.flpcp.base import FLPCP, Message, Proof, Query, Randomness
+from src.flpcp.polynomial import Coefficients, poly_add_scalar, poly_mul
 
 
 class BinaryValidation(FLPCP):
     """The FLPCP for validating if input is a valid binary number."""
 
-    def __init__(self, field_size: int, input_size: int):
+    def __init__(self, field_size: int, input_size: int, backend: str = "sage",
+                 template_path: Optional[str] = None, rng: Optional[Randomness] = None,
+                 chunk_length: Optional[int] = None):
         """
         Initialize the FLPCP class for validating if input is a valid binary number.
 
         :param field_size: The prime field size to use for all computations. Must be a prime number.
         :param input_size: The length of the input to validate.
+        :param backend: The field backend storing proofs and queries, either "sage" or "numpy".
+        :param template_path: An optional path to persist the query template of this configuration.
+        :param rng: The source of randomness of the proofs and queries, e.g. an `XofRandom`, by default `random`.
+        :param chunk_length: If given, the number of G-gates summed by each call of a ParallelSum gadget.
         """
         # Initialize the parent FLPCP class.
-        super().__init__(field_size)
+        super().__init__(field_size=field_size, backend=backend, rng=rng, chunk_length=chunk_length)
         # Set the degree of this circuit, which is fixed to be 2. The gate is x * (x - 1).
         self._degree = 2
         # Store the number of g-gates.
@@ -22,87 +31,36 @@ class BinaryValidation(FLPCP):
         # Store the total size.
         self._total_size = input_size + self._degree + self._proof_size
 
-    def proof_gen(self, message: Message) -> Proof:
-        """
-        Generate a proof for a given message vector.
+        # Build the query template.
+        self._init_template(template_path)
 
-        :param message: A list of integers representing the input message.
-        :return: A `Proof` object encoding the prover's response.
+    def _gate_eval(self, a_list: List[int]) -> int:
         """
-        # For the degree sample desired number of random values.
-        constants = [self._field.random_element() for _ in range(self._degree)]
-
-        # Get input lists.
-        input_list = [(index + 1, x) for index, x in enumerate(message)]
-
-        # Assume the first input is x, and the second is x - 1.
-        polynomials = [self._polynomial_interpolation([(0, c)] + input_list) for c in constants]
+        Evaluate the G-gate of the circuit, which is x * (x - 1).
 
-        # Compute the proof polynomial.
-        p = polynomials[0] * (polynomials[1] - 1)
+        :param a_list: The values of the two input wires.
+        :return: The output of the G-gate.
+        """
+        return a_list[0] * (a_list[1] - 1) % self._field_size
 
-        # Get the coefficients of the polynomial and pad it to the desired length.
-        p_coeff = (self._proof_size - len(p.list())) * [0] + p.list()
+    def _gate_poly_gen(self, polynomials: Iterable[Coefficients]) -> Coefficients:
+        """
+        Compose the G-gate over the wire polynomials, assume the first input is x, and the second is x - 1.
 
-        # Return message, random points, and coefficients, in order c0, c1, ..., cd.
-        return vector(self._field, message + constants + p_coeff)
+        :param polynomials: The two wire polynomials.
+        :return: The coefficients of the proof polynomial.
+        """
+        f_0, f_1 = polynomials
+        return poly_mul(f_0, poly_add_scalar(f_1, -1, self._field_size), self._field_size)
 
-    def query_gen(self) -> Query:
+    def proof_gen(self, message: Message) -> Proof:
         """
-        Generate a verifier query consisting of evaluation points and masking values.
+        Generate a proof for a given message vector.
 
-        :return: A `Query` tuple used for verification, which includes:
-            - a list of vectors (query coefficients) to compute f_i at r,
-            - a vector to evaluate the polynomial contained in the proof at r,
-            - a vector to compute the final output of the validated circuit.
+        :param message: A list of integers representing the input message.
+        :return: A `Proof` object encoding the prover's response.
         """
-        # Sample a random point that's larger than the number of g-gates.
-        r = self._random_larger_than(x=self._num_gate)
-
-        # Generate the lagrange basis.
-        lagrange_basis = self._query_lagrange_basis_gen(r, self._num_gate)
-
-        # Holder for the f polynomials.
-        f_poly = []
-
-        # Generate the A matrix, note that row of A has length equals to x || proof.
-        for i in range(self._degree):
-            # Generate the A matrix.
-            a_mat = [[0 for _ in range(self.total_size)] for _ in range(self._num_gate + 1)]
-            # Multiply with the constant.
-            a_mat[0][self._num_gate + i] = 1
-            # Multiply with the input message.
-            for j in range(self._num_gate):
-                a_mat[j + 1][j] = 1
-
-            # Multiply with the lagrange basis and sum up the vectors.
-            f_vec = [[basis * value for value in a_vec] for basis, a_vec in zip(lagrange_basis, a_mat)]
-
-            # Find the correct summarized vector.
-            f_vec_sum = [sum(col) for col in list(zip(*f_vec))]
-
-            # Append to the polynomial list.
-            f_poly.append(vector(self._field, f_vec_sum))
-
-        # Generate the vector to evaluate polynomial p at random r.
-        p_poly = vector(
-            self._field, [0] * (self._total_size - self._proof_size) + [r ** i for i in range(self._proof_size)]
-        )
-
-        # Generate the vector to compute the final output of the circuit.
-        queries = []
-        # Apply the optimization, to get a random combination of all g-gates output that matter.
-        for i in range(1, self._num_gate + 1):
-            # Sample a random point.
-            temp_r = self._random_larger_than(x=0)
-            queries.append([temp_r * i ** j for j in range(self._proof_size)])
-
-        # Summarize the query.
-        c_poly = vector(
-            self._field, [0] * (self._total_size - self._proof_size) + [sum(col) for col in list(zip(*queries))]
-        )
-
-        return f_poly, p_poly, c_poly
+        return self.proof_gen_prepared(message=message)
 
     def verify(self, proof: Proof, query: Query) -> bool:
         """
@@ -116,16 +74,16 @@ class BinaryValidation(FLPCP):
         f_list, p, c = query
 
         # Compute the a_i values.
-        a_list = [f * proof for f in f_list]
+        a_list = [self._backend.dot(f, proof) for f in f_list]
 
         # Compute the G-gate over the a_i values.
-        p_value = a_list[0] * (a_list[1] - 1)
+        p_value = self._gate_eval(a_list)
 
         # Evaluate the polynomial p.
-        p_prime_value = p * proof
+        p_prime_value = self._backend.dot(p, proof)
 
         # Evaluate the output of the entire circuit.
-        c_value = c * proof
+        c_value = self._backend.dot(c, proof)
 
         # Return the final decision.
         return p_value == p_prime_value and c_value == 0
@@ -1,16 +1,25 @@
-from src.flpcp.base import FLPCP, Message, Proof, Query, vector
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from src.flpcp.base import FLPCP, Message, Proof, Query, Randomness, SparseRow
+from src.flpcp.polynomial import Coefficients, poly_add_scalar, poly_mul
 
 
 class NormBoundValidation(FLPCP):
-    def __init__(self, field_size: int, input_size: int, norm_bound: int, input_bound: int):
+    def __init__(self, field_size: int, input_size: int, norm_bound: int, input_bound: int, backend: str = "sage",
+                 template_path: Optional[str] = None, rng: Optional[Randomness] = None,
+                 chunk_length: Optional[int] = None):
         """
         Initialize the FLPCP class for validating if some range bounds each input.
 
         :param field_size: The prime field size to use for all computations. Must be a prime number.
         :param input_size: The length of the input to validate.
+        :param backend: The field backend storing proofs and queries, either "sage" or "numpy".
+        :param template_path: An optional path to persist the query template of this configuration.
+        :param rng: The source of randomness of the proofs and queries, e.g. an `XofRandom`, by default `random`.
+        :param chunk_length: If given, the number of G-gates summed by each call of a ParallelSum gadget.
         """
         # Initialize the parent FLPCP class.
-        super().__init__(field_size)
+        super().__init__(field_size=field_size, backend=backend, rng=rng, chunk_length=chunk_length)
 
         # Store the bound for the integers.
         self._norm_bound = norm_bound + 1
@@ -28,6 +37,9 @@ class NormBoundValidation(FLPCP):
         # Store the total size.
         self._total_size = self._num_gate + self._degree + self._proof_size
 
+        # Build the query template.
+        self._init_template(template_path)
+
     @staticmethod
     def to_fixed_binary(x: int, length: int) -> Message:
         # Convert integer to binary and remove '0b' prefix.
@@ -39,138 +51,86 @@ class NormBoundValidation(FLPCP):
         # Convert the string to a list of integers.
         return [int(bit) for bit in bin_str[::-1]]
 
-    def _prepare_message(self, message: Message) -> Message:
+    def _expand_message(self, message: Iterable[int]) -> Iterator[int]:
+        """
+        Expand the input message into the message, the binary representation of each input, and of the squared norm.
+
+        :param message: An iterable of integers representing the input message.
+        :return: An iterator over the entries of the expanded message.
+        """
         # Let the result contain the real message first.
-        result = [x for x in message]
+        inputs = []
+        for x in message:
+            inputs.append(int(x))
+            yield inputs[-1]
 
         # Append the binary representation of each input to the result.
-        for x in message:
-            result += self.to_fixed_binary(x=x, length=self._input_bound)
+        for x in inputs:
+            yield from self.to_fixed_binary(x=x, length=self._input_bound)
 
         # Compute the bound on the message.
-        result += self.to_fixed_binary(x=sum([x ** 2 for x in message]), length=self._norm_bound)
-
-        # Return the final result.
-        return result
+        yield from self.to_fixed_binary(x=sum([x ** 2 for x in inputs]), length=self._norm_bound)
 
-    def proof_gen(self, message: Message) -> Proof:
+    def _checks_gen(self) -> Tuple[List[SparseRow], List[int]]:
         """
-        Generate a proof for a given message vector.
+        Generate the checks on the output of the circuit.
 
-        :param message: A list of integers representing the input message.
-        :return: A `Proof` object encoding the prover's response.
+        :return: The linear part of each check over x || proof, and the check that each G-gate output is added to.
         """
-        # Prepare the input message to the desired format.
-        message = self._prepare_message(message=message)
-
-        # For the degree sample desired number of random values.
-        constants = [self._field.random_element() for _ in range(self._degree)]
+        linear_checks = []
 
-        # Get input lists.
-        input_list = [(index + 1, x) for index, x in enumerate(message)]
+        # These are the checks that each input corresponds to its binary representation.
+        for i in range(self._input_size):
+            # Compute message - binary representation.
+            linear_checks.append(
+                [(i, 1)] + [(self._input_size + i * self._input_bound + j, -2 ** j) for j in range(self._input_bound)]
+            )
 
-        # Assume the first input is x, and the second is x - 1.
-        polynomials = [self._polynomial_interpolation([(0, c)] + input_list) for c in constants]
+        # This is the check that the norm bound binary representation is correct. Add the inputs x, so together with
+        # the G-gate outputs x^2 - x this computes the sum of x^2, and minus the binary representation.
+        norm_offset = self._input_size * (self._input_bound + 1)
+        linear_checks.append(
+            [(i, 1) for i in range(self._input_size)] + [(norm_offset + i, -2 ** i) for i in range(self._norm_bound)]
+        )
 
-        # Compute the proof polynomial.
-        p = polynomials[0] * (polynomials[1] - 1)
+        # The first input_size G-gates are summed up as p(1) to p(input_size) in the norm check.
+        gate_checks = [self._input_size] * self._input_size
 
-        # Get the coefficients of the polynomial and pad it to the desired length.
-        p_coeff = (self._proof_size - len(p.list())) * [0] + p.list()
+        # These are the checks that the rest of G-gates should output zero.
+        for i in range(self._input_size, self._num_gate):
+            gate_checks.append(len(linear_checks))
+            linear_checks.append([])
 
-        # Return message, random points, and coefficients, in order c0, c1, ..., cd.
-        return vector(self._field, message + constants + p_coeff)
+        return linear_checks, gate_checks
 
-    def query_gen(self) -> Query:
+    def _gate_eval(self, a_list: List[int]) -> int:
         """
-        Generate a verifier query consisting of evaluation points and masking values.
+        Evaluate the G-gate of the circuit, which is x * (x - 1).
 
-        :return: A `Query` tuple used for verification, which includes:
-            - a list of vectors (query coefficients) to compute f_i at r,
-            - a vector to evaluate the polynomial contained in the proof at r,
-            - a vector to compute the final output of the validated circuit.
+        :param a_list: The values of the two input wires.
+        :return: The output of the G-gate.
         """
-        # Sample a random point that's larger than the number of g-gates.
-        r = self._random_larger_than(x=self._num_gate)
-
-        # Generate the lagrange basis.
-        lagrange_basis = self._query_lagrange_basis_gen(r, self._num_gate)
-
-        # Holder for the f polynomials.
-        f_poly = []
-
-        # Generate the A matrix, note that row of A has length equals to x || proof.
-        for i in range(self._degree):
-            # Generate the A matrix.
-            a_mat = [[0 for _ in range(self.total_size)] for _ in range(self._num_gate + 1)]
-            # Multiply with the constant.
-            a_mat[0][self._num_gate + i] = 1
-            # Multiply with the input message.
-            for j in range(self._num_gate):
-                a_mat[j + 1][j] = 1
-
-            # Multiply with the lagrange basis and sum up the vectors.
-            f_vec = [[basis * value for value in a_vec] for basis, a_vec in zip(lagrange_basis, a_mat)]
-
-            # Find the correct summarized vector.
-            f_vec_sum = [sum(col) for col in list(zip(*f_vec))]
+        return a_list[0] * (a_list[1] - 1) % self._field_size
 
-            # Append to the polynomial list.
-            f_poly.append(vector(self._field, f_vec_sum))
-
-        # Generate the vector to evaluate polynomial p at random r.
-        p_poly = vector(
-            self._field, [0] * (self._total_size - self._proof_size) + [r ** i for i in range(self._proof_size)]
-        )
-
-        # Generate the vector to compute the final output of the circuit.
-        queries = []
-
-        # These are the query to verify each input corresponds to its binary representation.
-        for i in range(self._input_size):
-            # Sample a random point.
-            temp_r = self._random_larger_than(x=0)
-            # Get a temp query of all zeros.
-            temp_query = [0] * self._total_size
-
-            # Compute message - binary representation.
-            temp_query[i] = temp_r
-            for j in range(self._input_bound):
-                temp_query[self._input_size + i * self._input_bound + j] = -temp_r * 2 ** j
-
-            # Add the query to queries.
-            queries.append(temp_query)
-
-        # This is the query to verify the norm bound binary representation is correct.
-        temp_query = [1] * self._input_size + [0] * (self._total_size - self._input_size)
-
-        # Evaluate the polynomial from p(1) to p(input_size).
-        for i in range(1, self._input_size + 1):
-            for j in range(self._proof_size):
-                temp_query[self._total_size - self._proof_size + j] += i ** j
-
-        # Minus the binary representation.
-        for i in range(self._norm_bound):
-            temp_query[self._input_size * (self._input_bound + 1) + i] = -2 ** i
-
-        # Sample a random point.
-        temp_r = self._random_larger_than(x=0)
-
-        # Add the query to queries.
-        queries.append([temp_r * x for x in temp_query])
+    def _gate_poly_gen(self, polynomials: Iterable[Coefficients]) -> Coefficients:
+        """
+        Compose the G-gate over the wire polynomials, assume the first input is x, and the second is x - 1.
 
-        # These are the query to verify G-gates should output zero.
-        for i in range(self._input_size + 1, self._num_gate + 1):
-            # Sample a random point.
-            temp_r = self._random_larger_than(x=0)
-            queries.append(
-                [0] * (self._total_size - self._proof_size) + [temp_r * i ** j for j in range(self._proof_size)]
-            )
+        :param polynomials: The two wire polynomials.
+        :return: The coefficients of the proof polynomial.
+        """
+        f_0, f_1 = polynomials
+        return poly_mul(f_0, poly_add_scalar(f_1, -1, self._field_size), self._field_size)
 
-        # Summarize the query.
-        c_poly = vector(self._field, [sum(col) for col in list(zip(*queries))])
+    def proof_gen(self, message: Message) -> Proof:
+        """
+        Generate a proof for a given message vector.
 
-        return f_poly, p_poly, c_poly
+        :param message: A list of integers representing the input message.
+        :return: A `Proof` object encoding the prover's response.
+        """
+        # Prepare the input message to the desired format.
+        return self.proof_gen_prepared(message=self.prepare_message(message=message))
 
     def verify(self, proof: Proof, query: Query) -> bool:
         """
@@ -184,16 +144,16 @@ class NormBoundValidation(FLPCP):
         f_list, p, c = query
 
         # Compute the a_i values.
-        a_list = [f * proof for f in f_list]
+        a_list = [self._backend.dot(f, proof) for f in f_list]
 
         # Compute the G-gate over the a_i values.
-        p_value = a_list[0] * (a_list[1] - 1)
+        p_value = self._gate_eval(a_list)
 
         # Evaluate the polynomial p.
-        p_prime_value = p * proof
+        p_prime_value = self._backend.dot(p, proof)
 
         # Evaluate the output of the entire circuit.
-        c_value = c * proof
+        c_value = self._backend.dot(c, proof)
 
         # Return the final decision.
         return p_value == p_prime_value and c_value == 0
@@ -0,0 +1,464 @@
+from math import log2
+from typing import Dict, List, Optional, Tuple
+
+# Declare some useful types, a polynomial is the list of its coefficients in order c0, c1, ..., cd.
+Coefficients = List[int]
+
+# Below this length the schoolbook multiplication is faster than packing the coefficients.
+SCHOOLBOOK_THRESHOLD = 8
+# Below this product length the Kronecker substitution is faster than the number theoretic transform for any field.
+NTT_THRESHOLD = 1 << 11
+# Above it, the faster one is chosen by their costs in pure Python, fitted to measurements with 64, 127 and 255-bit
+# primes. The NTT costs about NTT_COST * n * log2(n) * (1 + bits / 128) for the padded length n, and the Kronecker
+# substitution about (size * slot) ** 1.58 for the product size and the slot bytes, as CPython multiplies big integers
+# with Karatsuba. E.g. with a 64-bit prime the NTT is faster from about 2^15 coefficients per input, while with a
+# 127-bit prime it is faster from about 2^12.
+NTT_COST = 1800
+
+# Cache the roots of unity found for NTT-friendly fields.
+_ntt_roots: Dict[int, Optional[Tuple[int, int]]] = {}
+
+
+def _ntt_root(p: int) -> Optional[Tuple[int, int]]:
+    """
+    Find a root of unity of order 2^k in GF(p), where 2^k is the largest power of two dividing p - 1.
+
+    :param p: The prime field size.
+    :return: The root of unity and its order, or None if the field does not allow NTT of useful length.
+    """
+    if p not in _ntt_roots:
+        # Find the two-adicity of p - 1.
+        k, odd = 0, p - 1
+        while odd % 2 == 0:
+            k, odd = k + 1, odd // 2
+
+        root = None
+        if (1 << k) >= NTT_THRESHOLD:
+            # Any quadratic non-residue g gives g^odd a root of unity of order exactly 2^k.
+            g = 2
+            while pow(g, (p - 1) // 2, p) != p - 1:
+                g += 1
+            root = (pow(g, odd, p), 1 << k)
+
+        _ntt_roots[p] = root
+
+    return _ntt_roots[p]
+
+
+def _ntt(a: Coefficients, root: int, p: int) -> Coefficients:
+    """
+    Compute the number theoretic transform of a in place, where len(a) is a power of two.
+
+    :param a: The coefficients to transform, padded to the transform length.
+    :param root: A root of unity of order len(a).
+    :param p: The prime field size.
+    :return: The evaluations of a at the powers of root.
+    """
+    n = len(a)
+
+    # Apply the bit reversal permutation.
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            a[i], a[j] = a[j], a[i]
+
+    # Apply the butterflies, doubling the length of each block.
+    length = 2
+    while length <= n:
+        w_length = pow(root, n // length, p)
+        half = length // 2
+        # Precompute the twiddle factors of this layer.
+        twiddles = [1] * half
+        for i in range(1, half):
+            twiddles[i] = twiddles[i - 1] * w_length % p
+        for start in range(0, n, length):
+            for i in range(half):
+                u = a[start + i]
+                v = a[start + i + half] * twiddles[i] % p
+                a[start + i] = (u + v) % p
+                a[start + i + half] = (u - v) % p
+        length <<= 1
+
+    return a
+
+
+def _ntt_mul(a: Coefficients, b: Coefficients, root: int, order: int, p: int) -> Coefficients:
+    """Multiply two polynomials with NTT, where the transform length must divide the order of root."""
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+
+    # Find the root of unity of order n.
+    root_n = pow(root, order // n, p)
+
+    # Transform, multiply point-wise, and transform back with the inverse root.
+    fa = _ntt(a + [0] * (n - len(a)), root_n, p)
+    fb = _ntt(b + [0] * (n - len(b)), root_n, p)
+    fc = _ntt([x * y % p for x, y in zip(fa, fb)], pow(root_n, -1, p), p)
+
+    # Scale by the inverse of the transform length.
+    n_inv = pow(n, -1, p)
+    return [x * n_inv % p for x in fc[:size]]
+
+
+def _kronecker_slot(a: Coefficients, b: Coefficients, p: int) -> int:
+    """Return the bytes per coefficient of the Kronecker substitution, which hold a coefficient of the product."""
+    return (2 * p.bit_length() + min(len(a), len(b)).bit_length() + 7) // 8
+
+
+def _ntt_faster(a: Coefficients, b: Coefficients, p: int) -> bool:
+    """Compare the estimated costs of the NTT and the Kronecker substitution to multiply two polynomials."""
+    size = len(a) + len(b) - 1
+    n = 1 << (size - 1).bit_length()
+    return NTT_COST * n * log2(n) * (1 + p.bit_length() / 128) < (size * _kronecker_slot(a, b, p)) ** 1.58
+
+
+def _kronecker_mul(a: Coefficients, b: Coefficients, p: int) -> Coefficients:
+    """Multiply two polynomials with Kronecker substitution, packing each into a single big integer."""
+    # Each slot must be large enough to hold a coefficient of the product without reduction.
+    slot = _kronecker_slot(a, b, p)
+
+    # Pack the coefficients in little endian order.
+    a_int = int.from_bytes(b"".join(x.to_bytes(slot, "little") for x in a), "little")
+    b_int = int.from_bytes(b"".join(x.to_bytes(slot, "little") for x in b), "little")
+
+    # Multiply and unpack the coefficients of the product.
+    size = len(a) + len(b) - 1
+    c_bytes = (a_int * b_int).to_bytes(size * slot, "little")
+    return [int.from_bytes(c_bytes[i * slot:(i + 1) * slot], "little") % p for i in range(size)]
+
+
+def poly_mul(a: Coefficients, b: Coefficients, p: int) -> Coefficients:
+    """
+    Multiply two polynomials over GF(p).
+
+    NTT is used when the field has roots of unity of the required order and it is estimated to be faster, and
+    Kronecker substitution otherwise.
+    :param a: The coefficients of the first polynomial, reduced modulo p.
+    :param b: The coefficients of the second polynomial, reduced modulo p.
+    :param p: The prime field size.
+    :return: The coefficients of a * b, with length len(a) + len(b) - 1.
+    """
+    if not a or not b:
+        return []
+
+    # Use the schoolbook multiplication for short inputs.
+    if min(len(a), len(b)) <= SCHOOLBOOK_THRESHOLD:
+        c = [0] * (len(a) + len(b) - 1)
+        for i, x in enumerate(a):
+            for j, y in enumerate(b):
+                c[i + j] += x * y
+        return [x % p for x in c]
+
+    # Use NTT when the field allows it and it is faster for these lengths.
+    size = len(a) + len(b) - 1
+    ntt_root = _ntt_root(p)
+    if ntt_root is not None and NTT_THRESHOLD <= size <= ntt_root[1] and _ntt_faster(a, b, p):
+        return _ntt_mul(a, b, *ntt_root, p)
+
+    return _kronecker_mul(a, b, p)
+
+
+def poly_eval(a: Coefficients, x: int, p: int) -> int:
+    """Evaluate the polynomial a at x over GF(p) with Horner's rule."""
+    result = 0
+    for coeff in reversed(a):
+        result = (result * x + coeff) % p
+    return result
+
+
+def poly_add_scalar(a: Coefficients, c: int, p: int) -> Coefficients:
+    """Add a scalar c to the polynomial a over GF(p)."""
+    return [(a[0] + c) % p] + a[1:] if a else [c % p]
+
+
+def poly_prod(polys: List[Coefficients], p: int) -> Coefficients:
+    """
+    Multiply a list of polynomials over GF(p) with a product tree, so the operands of each multiplication are balanced.
+
+    :param polys: A non-empty list of polynomials, each given by its coefficients.
+    :param p: The prime field size.
+    :return: The coefficients of the product.
+    """
+    while len(polys) > 1:
+        # Multiply adjacent pairs and carry the odd one to the next level.
+        paired = [poly_mul(polys[i], polys[i + 1], p) for i in range(0, len(polys) - 1, 2)]
+        polys = paired + polys[-1:] if len(polys) % 2 else paired
+
+    return polys[0]
+
+
+def factorial_inverses(n: int, p: int) -> List[int]:
+    """
+    Compute the inverses of factorials [1/0!, ..., 1/n!] over GF(p) with a single inversion.
+
+    :param n: The largest factorial to invert, must be smaller than p.
+    :param p: The prime field size.
+    :return: A list of the inverses.
+    """
+    # Compute n! with a running product.
+    factorial = 1
+    for i in range(1, n + 1):
+        factorial = factorial * i % p
+
+    # Invert n! once and walk down to 0!, since 1/(i - 1)! = i / i!.
+    inverses = [0] * (n + 1)
+    inverses[n] = pow(factorial, -1, p)
+    for i in range(n, 0, -1):
+        inverses[i - 1] = inverses[i] * i % p
+
+    return inverses
+
+
+def factorial_inverses_valid(inverses: List[int], n: int, p: int) -> bool:
+    """
+    Check the output of `factorial_inverses` in O(n), since 1/0! = 1 and 1/(i - 1)! = i / i! determine all entries.
+
+    :param inverses: The list to check.
+    :param n: The largest inverted factorial.
+    :param p: The prime field size.
+    :return: True if the list holds the inverses of factorials [1/0!, ..., 1/n!].
+    """
+    if len(inverses) != n + 1 or inverses[0] != 1:
+        return False
+
+    return all(0 <= inverses[i] < p and inverses[i - 1] == inverses[i] * i % p for i in range(1, n + 1))
+
+
+def interpolate(values: List[int], p: int) -> Coefficients:
+    """
+    Find the polynomial f of degree at most n such that f(j) = values[j] for all j in {0, ..., n}.
+
+    Unlike `InterpolationDomain`, the subproduct tree is not kept. Each half of the domain is combined recursively and
+    its product of (x - j) is rebuilt on the way up, so the peak memory is O(n) integers at a slightly higher cost.
+    :param values: The n + 1 evaluations, reduced modulo p.
+    :param p: The prime field size, must be larger than n.
+    :return: The n + 1 coefficients of f, in order c0, c1, ..., cn.
+    """
+    n = len(values) - 1
+    inverses = factorial_inverses(n, p)
+
+    def _combine(low: int, high: int) -> Tuple[Coefficients, Coefficients]:
+        """Return the sum of y_j * w_j * prod_{m != j} (x - m) and prod (x - m) over m in [low, high)."""
+        if high - low == 1:
+            weight = (-1) ** (n - low) * inverses[low] * inverses[n - low]
+            return [values[low] * weight % p], [-low % p, 1]
+
+        middle = (low + high) // 2
+        n_left, m_left = _combine(low, middle)
+        n_right, m_right = _combine(middle, high)
+
+        # Combine the children as N = N_left * M_right + N_right * M_left.
+        left, right = poly_mul(n_left, m_right, p), poly_mul(n_right, m_left, p)
+        size = max(len(left), len(right))
+        left, right = left + [0] * (size - len(left)), right + [0] * (size - len(right))
+        return [(x + y) % p for x, y in zip(left, right)], poly_mul(m_left, m_right, p)
+
+    f, _ = _combine(0, n + 1)
+
+    # Pad the coefficients to the full length.
+    return f + [0] * (n + 1 - len(f))
+
+
+def poly_inverse_series(a: Coefficients, length: int, p: int) -> Coefficients:
+    """
+    Compute the power series inverse of a modulo x^length over GF(p) with Newton iteration.
+
+    Each step doubles the precision with g = g * (2 - a * g), so the cost is O(M(length)).
+    :param a: The coefficients of a polynomial with a non-zero constant term.
+    :param length: The number of coefficients of the inverse to compute.
+    :param p: The prime field size.
+    :return: The coefficients of 1 / a modulo x^length.
+    """
+    g = [pow(a[0], -1, p)]
+    precision = 1
+
+    while precision < length:
+        precision = min(2 * precision, length)
+        # Compute 2 - a * g modulo x^precision.
+        e = [-x % p for x in poly_mul(a[:precision], g, p)[:precision]]
+        e[0] = (e[0] + 2) % p
+        g = poly_mul(g, e, p)[:precision]
+
+    return g + [0] * (length - len(g))
+
+
+def subproduct_tree(leaves: List[Coefficients], p: int) -> List[List[Coefficients]]:
+    """
+    Build the subproduct tree of a list of polynomials, where each level holds the products of adjacent pairs below.
+
+    :param leaves: A non-empty list of polynomials.
+    :param p: The prime field size.
+    :return: The levels of the tree from the leaves up, the root itself is not included.
+    """
+    tree = [leaves]
+
+    while len(tree[-1]) > 2:
+        # Multiply adjacent pairs and carry the odd one to the next level.
+        level = tree[-1]
+        paired = [poly_mul(level[i], level[i + 1], p) for i in range(0, len(level) - 1, 2)]
+        tree.append(paired + level[-1:] if len(level) % 2 else paired)
+
+    return tree
+
+
+def subproduct_tree_combine(values: List[int], tree: List[List[Coefficients]], p: int) -> Coefficients:
+    """
+    Compute the sum of values[i] * prod_{m != i} leaves[m] bottom-up along a subproduct tree.
+
+    Each node combines its children as N = N_left * M_right + N_right * M_left, so the cost is O(M(n) log n).
+    :param values: One value for each leaf, reduced modulo p.
+    :param tree: The subproduct tree built from the leaves.
+    :param p: The prime field size.
+    :return: The coefficients of the sum.
+    """
+    # Each leaf holds its value as a constant polynomial.
+    nodes = [[value] for value in values]
+
+    for level in tree:
+        combined = []
+        for i in range(0, len(nodes) - 1, 2):
+            left = poly_mul(nodes[i], level[i + 1], p)
+            right = poly_mul(nodes[i + 1], level[i], p)
+            # Pad the shorter product before adding them up.
+            size = max(len(left), len(right))
+            left, right = left + [0] * (size - len(left)), right + [0] * (size - len(right))
+            combined.append([(x + y) % p for x, y in zip(left, right)])
+        nodes = combined + nodes[-1:] if len(nodes) % 2 else combined
+
+    return nodes[0]
+
+
+class InterpolationDomain:
+    """
+    The interpolation domain {0, 1, ..., n} over GF(p).
+
+    The barycentric weights w_j = 1 / prod_{m != j} (j - m) and the subproduct tree of (x - j) only depend on the
+    domain, so they are computed once and reused for each interpolation. A polynomial is then recovered from its values
+    y_j as the sum of y_j * w_j * prod_{m != j} (x - m), which is combined bottom-up along the tree with
+    O(M(n) log n) operations, where M(n) is the cost of multiplying polynomials of degree n.
+    """
+
+    def __init__(self, p: int, n: int):
+        """
+        Initialize the interpolation domain.
+
+        :param p: The prime field size, must be larger than n.
+        :param n: The largest point of the domain.
+        """
+        self._p = p
+        self._n = n
+
+        # Compute the inverses of factorials with a single inversion.
+        inverses = factorial_inverses(n, p)
+
+        # The weight of point j is (-1)^(n - j) / (j! * (n - j)!).
+        self._weights = [(-1) ** (n - j) * inverses[j] * inverses[n - j] % p for j in range(n + 1)]
+
+        # Build the subproduct tree from the leaves (x - j).
+        self._tree = subproduct_tree([[-j % p, 1] for j in range(n + 1)], p)
+
+    @property
+    def size(self) -> int:
+        """Return the number of points in the domain."""
+        return self._n + 1
+
+    def interpolate(self, values: List[int]) -> Coefficients:
+        """
+        Find the polynomial f of degree at most n such that f(j) = values[j] for all j in {0, ..., n}.
+
+        :param values: The n + 1 evaluations, reduced modulo p.
+        :return: The n + 1 coefficients of f, in order c0, c1, ..., cn.
+        """
+        if len(values) != self.size:
+            raise ValueError(f"Expected {self.size} evaluations but received {len(values)}.")
+
+        # Combine y_j * w_j * prod_{m != j} (x - m) along the tree.
+        f = subproduct_tree_combine([y * w % self._p for y, w in zip(values, self._weights)], self._tree, self._p)
+
+        # Pad the coefficients to the full length.
+        return f + [0] * (self.size - len(f))
+
+
+def power_sums_precompute(points: List[int], length: int, p: int) -> Tuple[List[List[Coefficients]], Coefficients]:
+    """
+    Precompute the parts of the weighted power sums of fixed points x_1, ..., x_n that do not depend on the weights.
+
+    For weights w_i, the power sums c_j = sum_i w_i * x_i^j for j in [0, length) are the coefficients of the power
+    series sum_i w_i / (1 - x_i * t) = N(t) / D(t), where D(t) = prod_i (1 - x_i * t). The subproduct tree of
+    (1 - x_i * t) and the inverse series of D only depend on the points.
+    :param points: The non-empty list of points x_1, ..., x_n.
+    :param length: The number of power sums to compute.
+    :param p: The prime field size.
+    :return: The subproduct tree of (1 - x_i * t) and the coefficients of 1 / D(t) modulo t^length.
+    """
+    # Build the subproduct tree from the leaves (1 - x_i * t).
+    tree = subproduct_tree([[1, -x % p] for x in points], p)
+
+    # Compute D(t) from the top of the tree and its inverse series.
+    return tree, poly_inverse_series(poly_prod(tree[-1], p), length, p)
+
+
+def power_sums_precompute_valid(
+        points: List[int], length: int, tree: List[List[Coefficients]], denominator_inverse: Coefficients, p: int,
+        x: int
+) -> bool:
+    """
+    Check the output of `power_sums_precompute`, without building the subproduct tree again.
+
+    The leaves and the shape of the tree are compared exactly, and each inner node is compared with the product of its
+    children at the point x, so the check costs O(n log n) additions and multiplications. The inverse series is
+    checked exactly with one multiplication, since D(t) / D(t) = 1 modulo t^length.
+    :param points: The points x_1, ..., x_n.
+    :param length: The number of power sums.
+    :param tree: The subproduct tree to check.
+    :param denominator_inverse: The inverse series to check.
+    :param p: The prime field size.
+    :param x: The point to evaluate the nodes at.
+    :return: True if the tree and the inverse series are the ones of the points.
+    """
+    if not tree or tree[0] != [[1, -point % p] for point in points] or len(denominator_inverse) != length:
+        return False
+
+    # Each level multiplies adjacent pairs of the level below and carries the odd one, until at most two nodes are left.
+    below = [poly_eval(node, x, p) for node in tree[0]]
+    for level, children in zip(tree[1:], tree):
+        if len(children) <= 2 or len(level) != (len(children) + 1) // 2:
+            return False
+        pairs, odd = range(0, len(children) - 1, 2), len(children) % 2
+        sizes = [len(children[i]) + len(children[i + 1]) - 1 for i in pairs] + [len(children[-1])] * odd
+        if [len(node) for node in level] != sizes:
+            return False
+
+        values = [poly_eval(node, x, p) for node in level]
+        if values != [below[i] * below[i + 1] % p for i in pairs] + below[len(below) - odd:]:
+            return False
+        below = values
+    if len(tree[-1]) > 2:
+        return False
+
+    # The product D(t) of the top level times its inverse series should be one modulo t^length.
+    product = poly_mul(poly_prod(tree[-1], p), denominator_inverse, p)[:length]
+    return product == [1] + [0] * (length - 1)
+
+
+def power_sums(
+        weights: List[int], tree: List[List[Coefficients]], denominator_inverse: Coefficients, p: int
+) -> List[int]:
+    """
+    Compute the weighted power sums c_j = sum_i w_i * x_i^j for j in [0, length) from the precomputed parts.
+
+    Only N(t) is combined along the tree and multiplied by 1 / D(t), which costs O(M(n) log n + M(length)) instead of
+    O(n * length) for summing up the powers directly.
+    :param weights: The weight of each point, reduced modulo p.
+    :param tree: The subproduct tree of (1 - x_i * t).
+    :param denominator_inverse: The coefficients of 1 / D(t) modulo t^length.
+    :param p: The prime field size.
+    :return: A list of power sums [c_0, ..., c_{length - 1}].
+    """
+    numerator = subproduct_tree_combine(weights, tree, p)
+    return poly_mul(numerator, denominator_inverse, p)[:len(denominator_inverse)]
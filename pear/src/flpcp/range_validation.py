@@ -1,10 +1,29 @@
-from src.flpcp.base import FLPCP, Message, Proof, Query, vector
+from math import log2
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from src.flpcp.base import FLPCP, Message, Proof, Query, Randomness, SparseRow
+from src.flpcp.polynomial import Coefficients, poly_add_scalar, poly_prod
+
+# The strategies of the range check, a product gate over the whole range or a decomposition into binary digits.
+PRODUCT = "product"
+BITS = "bits"
 
-class RangeValidation(FLPCP):
-    """The FLPCP for validating if some range bounds each input."""
 
-    def __init__(self, field_size: int, input_size: int, lower: int, upper: int):
+class RangeValidation(FLPCP):
+    """
+    The FLPCP for validating if some range bounds each input.
+
+    Each input x is checked in one of two ways, whichever has the lower cost for the range:
+    - the product gate (x - lower) * (x - lower - 1) * ... * (x - upper), whose degree is the width of the range,
+    - the binary digits of x - lower and upper - x, with B bits each for B the bit length of upper - lower. Each digit
+      is stored as bit + 1 and checked by the gate (d - 1) * (d - 2) of degree two. The message is extended with the
+      anchors 1 and 2, which the gate and the check 2 * 1 - 2 = 0 pin down, so the shifts by lower and upper are
+      linear checks on the anchor 1. The two digit checks add up to upper - lower, so both values are non-negative.
+    """
+
+    def __init__(self, field_size: int, input_size: int, lower: int, upper: int, backend: str = "sage",
+                 template_path: Optional[str] = None, rng: Optional[Randomness] = None,
+                 chunk_length: Optional[int] = None, strategy: Optional[str] = None):
         """
         Initialize the FLPCP class for validating if some range bounds each input.
 
@@ -12,106 +31,188 @@ class RangeValidation(FLPCP):
         :param input_size: The length of the input to validate.
         :param lower: The lower bound of the range to validate.
         :param upper: The upper bound of the range to validate.
+        :param backend: The field backend storing proofs and queries, either "sage" or "numpy".
+        :param template_path: An optional path to persist the query template of this configuration.
+        :param rng: The source of randomness of the proofs and queries, e.g. an `XofRandom`, by default `random`.
+        :param chunk_length: If given, the number of G-gates summed by each call of a ParallelSum gadget.
+        :param strategy: Either "product" or "bits" to fix the range check, by default the one of lower cost.
         """
         # Initialize the parent FLPCP class.
-        super().__init__(field_size)
+        super().__init__(field_size=field_size, backend=backend, rng=rng, chunk_length=chunk_length)
 
         # Store the desired range for the proof.
         self._lower = lower
         self._upper = upper
+        self._input_size = input_size
+        # The number of binary digits of each of x - lower and upper - x.
+        self._num_bits = max(1, (upper - lower).bit_length())
+
+        # Choose the range check.
+        if strategy is None:
+            strategy = min([PRODUCT, BITS], key=lambda name: self._cost(*self._sizes(name)))
+        if strategy not in (PRODUCT, BITS):
+            raise ValueError(f"The strategy must be {PRODUCT!r} or {BITS!r}.")
+        self._strategy = strategy
+
+        # Set the degree of this circuit, the number of g-gates, and the proof and total sizes.
+        self._num_gate, self._degree, self._proof_size, self._total_size = self._sizes(strategy)
+        # The gate is (x - gate_lower) * ... * (x - gate_lower - degree + 1), over the digits 1 and 2 for bits.
+        self._gate_lower = lower if strategy == PRODUCT else 1
+
+        # Build the query template.
+        self._init_template(template_path)
+
+    @property
+    def strategy(self) -> str:
+        """Return the strategy of the range check, either "product" or "bits"."""
+        return self._strategy
+
+    def _sizes(self, strategy: str) -> Tuple[int, int, int, int]:
+        """
+        Compute the sizes of the circuit of a strategy.
 
-        # Set the degree of this circuit. The gate is (x - lower) * (x - lower - 1) * ... * (x - upper).
-        self._degree = upper - lower + 1
-        # Store the number of g-gates.
-        self._num_gate = input_size
-        # Store the proof size.
-        self._proof_size = self._num_gate * self._degree + 1
-        # Store the total size.
-        self._total_size = input_size + self._degree + self._proof_size
-
-    def proof_gen(self, message: Message) -> Proof:
+        :param strategy: Either "product" or "bits".
+        :return: The number of G-gates, the degree, the proof size and the total size.
         """
-        Generate a proof for a given message vector.
+        if strategy == PRODUCT:
+            num_gate, degree = self._input_size, self._upper - self._lower + 1
+            message_size = self._input_size
+        else:
+            # Each input has the digits of x - lower and upper - x, and the two anchors go through a G-gate too.
+            num_gate, degree = 2 * self._num_bits * self._input_size + 2, 2
+            message_size = self._input_size + num_gate
+
+        proof_size = num_gate * degree + 1
+        return num_gate, degree, proof_size, message_size + degree + proof_size
+
+    @staticmethod
+    def _cost(num_gate: int, degree: int, proof_size: int, total_size: int) -> float:
+        """
+        Estimate the cost of a circuit, as the number of field operations of the prover and the verifier.
+
+        The prover interpolates degree wire polynomials over num_gate points and multiplies them, which is about
+        degree * num_gate * log(num_gate) operations with fast arithmetic. The verifier computes degree + 2 dot products
+        over the proof of total_size entries, so its cost also accounts for the size of the proof.
+        :param num_gate: The number of G-gates.
+        :param degree: The degree of the G-gate.
+        :param proof_size: The number of proof coefficients.
+        :param total_size: The size of the message and proof combined.
+        :return: The estimated cost.
+        """
+        return degree * num_gate * log2(num_gate + 1) + proof_size + (degree + 2) * total_size
 
-        :param message: A list of integers representing the input message.
-        :return: A `Proof` object encoding the prover's response.
+    def _digits(self, x: int) -> Message:
         """
-        # For the degree sample desired number of random values.
-        constants = [self._field.random_element() for _ in range(self._degree)]
+        Represent an integer by its binary digits, each stored as bit + 1.
 
-        # Get input lists.
-        input_list = [(index + 1, x) for index, x in enumerate(message)]
+        :param x: The integer, only its lowest num_bits bits are kept.
+        :return: The num_bits digits, the least significant first.
+        """
+        return [(x >> j & 1) + 1 for j in range(self._num_bits)]
 
-        # Assume the first input is x, and the second is x - 1.
-        polynomials = [self._polynomial_interpolation([(0, c)] + input_list) for c in constants]
+    def _expand_message(self, message: Iterable[int]) -> Iterator[int]:
+        """
+        Expand the input message, with the bits strategy into the message, the digits of x - lower and of upper - x
+        of each input, and the anchors 1 and 2.
 
-        # Compute the proof polynomial.
-        p = 1
-        for i, polynomial in enumerate(polynomials):
-            p = p * (polynomial - i - self._lower)
+        :param message: An iterable of integers representing the input message.
+        :return: An iterator over the entries of the expanded message.
+        """
+        if self._strategy == PRODUCT:
+            yield from message
+            return
+
+        # Let the result contain the real message first.
+        inputs = []
+        for x in message:
+            inputs.append(int(x))
+            yield inputs[-1]
+
+        # Append the digits of the distances to the bounds, then the anchors.
+        for x in inputs:
+            yield from self._digits(x - self._lower)
+        for x in inputs:
+            yield from self._digits(self._upper - x)
+        yield from [1, 2]
+
+    def _wiring_gen(self) -> Tuple[List[int], List[int]]:
+        """
+        Generate the wiring of the G-gates, with the bits strategy the G-gates read the entries after the inputs.
 
-        # Get the coefficients of the polynomial and pad it to the desired length.
-        p_coeff = (self._proof_size - len(p.list())) * [0] + p.list()
+        :return: The message position read by each G-gate and the position of the constant read by each wire.
+        """
+        if self._strategy == PRODUCT:
+            return super()._wiring_gen()
 
-        # Return message, random points, and coefficients, in order c0, c1, ..., cd.
-        return vector(self._field, message + constants + p_coeff)
+        offset = self._input_size
+        return [offset + j for j in range(self._num_gate)], [offset + self._num_gate + i for i in range(self._degree)]
 
-    def query_gen(self) -> Query:
+    def _checks_gen(self) -> Tuple[List[SparseRow], List[int]]:
         """
-        Generate a verifier query consisting of evaluation points and masking values.
+        Generate the checks on the output of the circuit, with the bits strategy the linear checks of the digits.
 
-        :return: A `Query` tuple used for verification, which includes:
-            - a list of vectors (query coefficients) to compute f_i at r,
-            - a vector to evaluate the polynomial contained in the proof at r,
-            - a vector to compute the final output of the validated circuit.
+        :return: The linear part of each check over x || proof, and the check that each G-gate output is added to.
         """
-        # Sample a random point that's larger than the number of g-gates.
-        r = self._random_larger_than(x=self._num_gate)
+        if self._strategy == PRODUCT:
+            return super()._checks_gen()
 
-        # Generate the lagrange basis.
-        lagrange_basis = self._query_lagrange_basis_gen(r, self._num_gate)
+        n, bits = self._input_size, self._num_bits
+        one = n + 2 * n * bits
+        shift = 2 ** bits - 1
+        linear_checks = []
 
-        # Holder for the f polynomials.
-        f_poly = []
+        # The digits d of x - lower satisfy x - lower = sum 2^j (d_j - 1), where the constants are multiples of one.
+        for i in range(n):
+            linear_checks.append(
+                [(i, 1), (one, shift - self._lower)] + [(n + i * bits + j, -2 ** j) for j in range(bits)]
+            )
 
-        # Generate the A matrix, note that row of A has length equals to x || proof.
-        for i in range(self._degree):
-            # Generate the A matrix.
-            a_mat = [[0 for _ in range(self.total_size)] for _ in range(self._num_gate + 1)]
-            # Multiply with the constant.
-            a_mat[0][self._num_gate + i] = 1
-            # Multiply with the input message.
-            for j in range(self._num_gate):
-                a_mat[j + 1][j] = 1
+        # The digits d of upper - x satisfy upper - x = sum 2^j (d_j - 1).
+        for i in range(n):
+            linear_checks.append(
+                [(i, -1), (one, shift + self._upper)] + [(n + (n + i) * bits + j, -2 ** j) for j in range(bits)]
+            )
 
-            # Multiply with the lagrange basis and sum up the vectors.
-            f_vec = [[basis * value for value in a_vec] for basis, a_vec in zip(lagrange_basis, a_mat)]
+        # The anchors are 1 and 2, as both are digits and twice the first is the second.
+        linear_checks.append([(one, 2), (one + 1, -1)])
 
-            # Find the correct summarized vector.
-            f_vec_sum = [sum(col) for col in list(zip(*f_vec))]
+        # Each G-gate should output zero.
+        gate_checks = list(range(len(linear_checks), len(linear_checks) + self._num_gate))
+        linear_checks += [[] for _ in range(self._num_gate)]
 
-            # Append to the polynomial list.
-            f_poly.append(vector(self._field, f_vec_sum))
+        return linear_checks, gate_checks
 
-        # Generate the vector to evaluate polynomial p at random r.
-        p_poly = vector(
-            self._field, [0] * (self._total_size - self._proof_size) + [r ** i for i in range(self._proof_size)]
-        )
+    def _gate_eval(self, a_list: List[int]) -> int:
+        """
+        Evaluate the G-gate of the circuit, which is (x - gate_lower) * (x - gate_lower - 1) * ... .
+
+        :param a_list: The values of the input wires, one for each degree.
+        :return: The output of the G-gate.
+        """
+        p_value = 1
+        for i, a in enumerate(a_list):
+            p_value = p_value * (a - self._gate_lower - i) % self._field_size
+        return p_value
+
+    def _gate_poly_gen(self, polynomials: Iterable[Coefficients]) -> Coefficients:
+        """
+        Compose the G-gate over the wire polynomials, where the i-th input is x - gate_lower - i.
 
-        # Generate the vector to compute the final output of the circuit.
-        queries = []
-        # Apply the optimization, to get a random combination of all g-gates output that matter.
-        for i in range(1, self._num_gate + 1):
-            # Sample a random point.
-            temp_r = self._random_larger_than(x=0)
-            queries.append([temp_r * i ** j for j in range(self._proof_size)])
+        :param polynomials: The wire polynomials, one for each degree.
+        :return: The coefficients of the proof polynomial.
+        """
+        factors = [poly_add_scalar(f, -i - self._gate_lower, self._field_size) for i, f in enumerate(polynomials)]
+        return poly_prod(factors, self._field_size)
 
-        # Summarize the query.
-        c_poly = vector(
-            self._field, [0] * (self._total_size - self._proof_size) + [sum(col) for col in list(zip(*queries))]
-        )
+    def proof_gen(self, message: Message) -> Proof:
+        """
+        Generate a proof for a given message vector.
 
-        return f_poly, p_poly, c_poly
+        :param message: A list of integers representing the input message.
+        :return: A `Proof` object encoding the prover's response.
+        """
+        # Prepare the input message to the desired format.
+        return self.proof_gen_prepared(message=self.prepare_message(message=message))
 
     def verify(self, proof: Proof, query: Query) -> bool:
         """
@@ -125,18 +226,16 @@ class RangeValidation(FLPCP):
         f_list, p, c = query
 
         # Compute the a_i values.
-        a_list = [f * proof for f in f_list]
+        a_list = [self._backend.dot(f, proof) for f in f_list]
 
         # Compute the G-gate over the a_i values.
-        p_value = 1
-        for i, a in enumerate(a_list):
-            p_value *= (a - self._lower - i)
+        p_value = self._gate_eval(a_list)
 
         # Evaluate the polynomial p.
-        p_prime_value = p * proof
+        p_prime_value = self._backend.dot(p, proof)
 
         # Evaluate the output of the entire circuit.
-        c_value = c * proof
+        c_value = self._backend.dot(c, proof)
 
         # Return the final decision.
         return p_value == p_prime_value and c_value == 0
@@ -0,0 +1,254 @@
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from src.flpcp.backend import FieldBackend, Vector
+
+# The wire format starts with a fixed header: magic, version, kind, element size, number of vectors, vector length.
+# It is followed by the field size and then the vectors, each as fixed-width little-endian elements.
+MAGIC = b"FLPC"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHII")
+
+# The kinds of payload, a proof is one vector and a query is the f vectors followed by the p and c vectors.
+PROOF = 0
+QUERY = 1
+
+
+@dataclass
+class WireHeader:
+    """The header of a serialized proof or query."""
+    kind: int
+    field_size: int
+    element_size: int
+    num_vector: int
+    vector_size: int
+
+    @property
+    def offset(self) -> int:
+        """Return the number of bytes before the first vector."""
+        return HEADER.size + self.element_size
+
+    @property
+    def nbytes(self) -> int:
+        """Return the total number of bytes of the serialized payload."""
+        return self.offset + self.num_vector * self.vector_size * self.element_size
+
+
+def element_size(field_size: int) -> int:
+    """Return the number of bytes needed to store an element of GF(p), where p = field_size."""
+    return (int(field_size - 1).bit_length() + 7) // 8
+
+
+def pack_elements(values: Iterable[int], size: int) -> bytes:
+    """
+    Pack field elements as fixed-width little-endian integers.
+
+    :param values: The field elements, as integers in [0, p).
+    :param size: The number of bytes of each element.
+    :return: The packed bytes.
+    """
+    return b"".join(int(x).to_bytes(size, "little") for x in values)
+
+
+def unpack_elements(data: bytes, size: int) -> List[int]:
+    """
+    Unpack field elements written by `pack_elements`.
+
+    :param data: The packed bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :param size: The number of bytes of each element.
+    :return: The field elements as integers.
+    """
+    data = memoryview(data)
+    return [int.from_bytes(data[i:i + size], "little") for i in range(0, len(data), size)]
+
+
+def dump_vectors(vectors: List[Vector], kind: int, field_size: int) -> bytes:
+    """
+    Serialize vectors of the same length over GF(p) with a header.
+
+    :param vectors: The vectors, in the format of any backend or as lists of integers in [0, p).
+    :param kind: The kind of payload, PROOF or QUERY.
+    :param field_size: The prime field size p.
+    :return: The serialized bytes.
+    """
+    size = element_size(field_size)
+    vector_size = len(vectors[0]) if vectors else 0
+
+    # All vectors should have the same length to be stored as a matrix.
+    if any(len(vec) != vector_size for vec in vectors):
+        raise ValueError("All vectors must have the same length.")
+
+    header = HEADER.pack(MAGIC, VERSION, kind, size, len(vectors), vector_size)
+    return header + int(field_size).to_bytes(size, "little") + b"".join(pack_elements(vec, size) for vec in vectors)
+
+
+def load_header(data: bytes) -> WireHeader:
+    """
+    Parse and validate the header of a serialized proof or query.
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :return: The parsed header.
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ValueError("The data is too short to contain a header.")
+
+    magic, version, kind, size, num_vector, vector_size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("The data is not a serialized FLPCP proof or query of a supported version.")
+
+    header = WireHeader(
+        kind=kind,
+        field_size=int.from_bytes(data[HEADER.size:HEADER.size + size], "little"),
+        element_size=size,
+        num_vector=num_vector,
+        vector_size=vector_size
+    )
+    if len(data) < header.nbytes:
+        raise ValueError("The data is shorter than the size given by its header.")
+
+    return header
+
+
+def load_vectors(data: bytes) -> Tuple[WireHeader, List[memoryview]]:
+    """
+    Split serialized data into the packed bytes of each vector, without copying.
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :return: The header and a memoryview of the packed elements of each vector.
+    """
+    data = memoryview(data)
+    header = load_header(data)
+    length = header.vector_size * header.element_size
+
+    return header, [data[header.offset + i * length:header.offset + (i + 1) * length] for i in range(header.num_vector)]
+
+
+def load_array(data: bytes):
+    """
+    View serialized data as a NumPy array, without copying or creating an object per element.
+
+    Elements of 1, 2, 4 or 8 bytes are viewed as unsigned integers of shape (num_vector, vector_size), larger elements
+    are viewed as their little-endian bytes of shape (num_vector, vector_size, element_size).
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :return: The header and the array view.
+    """
+    if np is None:
+        raise ImportError("Loading as an array requires numpy to be installed.")
+
+    header = load_header(data)
+    size = header.element_size
+    count = header.num_vector * header.vector_size
+
+    # Use a native integer type when there is one of the element size.
+    if size in (1, 2, 4, 8):
+        array = np.frombuffer(data, dtype=np.dtype(f"<u{size}"), count=count, offset=header.offset)
+        return header, array.reshape(header.num_vector, header.vector_size)
+
+    array = np.frombuffer(data, dtype=np.uint8, count=count * size, offset=header.offset)
+    return header, array.reshape(header.num_vector, header.vector_size, size)
+
+
+def map_file(path: str) -> memoryview:
+    """
+    Memory-map a file of serialized data for reading.
+
+    :param path: The path of the file.
+    :return: A read-only memoryview of the file, which can be passed to the loading functions.
+    """
+    with open(path, "rb") as file:
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def _load_kind(data: bytes, kind: int, backend: FieldBackend) -> List[Vector]:
+    """
+    Load the vectors of a payload of given kind into a backend.
+
+    :param data: The serialized bytes.
+    :param kind: The expected kind of payload.
+    :param backend: The field backend to store the vectors.
+    :return: The list of vectors.
+    """
+    header, views = load_vectors(data)
+    if header.kind != kind:
+        raise ValueError("The data does not contain the expected kind of payload.")
+    if header.field_size != backend.field_size:
+        raise ValueError(f"The data is over GF({header.field_size}), expected GF({backend.field_size}).")
+
+    return [backend.vector(unpack_elements(view, header.element_size)) for view in views]
+
+
+def dump_proof(proof: Vector, field_size: int) -> bytes:
+    """
+    Serialize a proof.
+
+    :param proof: The proof, in the format of any backend.
+    :param field_size: The prime field size p.
+    :return: The serialized bytes.
+    """
+    return dump_vectors([proof], kind=PROOF, field_size=field_size)
+
+
+def load_proof(data: bytes, backend: FieldBackend) -> Vector:
+    """
+    Load a proof written by `dump_proof`.
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :param backend: The field backend to store the proof, which should use the same field.
+    :return: The proof.
+    """
+    return _load_kind(data, kind=PROOF, backend=backend)[0]
+
+
+def dump_proofs(proofs: List[Vector], field_size: int) -> bytes:
+    """
+    Serialize many proofs of the same size.
+
+    :param proofs: The proofs, in the format of any backend.
+    :param field_size: The prime field size p.
+    :return: The serialized bytes.
+    """
+    return dump_vectors(proofs, kind=PROOF, field_size=field_size)
+
+
+def load_proofs(data: bytes, backend: FieldBackend) -> List[Vector]:
+    """
+    Load the proofs written by `dump_proof` or `dump_proofs`.
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :param backend: The field backend to store the proofs, which should use the same field.
+    :return: The list of proofs.
+    """
+    return _load_kind(data, kind=PROOF, backend=backend)
+
+
+def dump_query(query: Tuple[List[Vector], Vector, Vector], field_size: int) -> bytes:
+    """
+    Serialize a query.
+
+    :param query: The query, a list of f vectors followed by the p and c vectors.
+    :param field_size: The prime field size p.
+    :return: The serialized bytes.
+    """
+    f_list, p_vec, c_vec = query
+    return dump_vectors(list(f_list) + [p_vec, c_vec], kind=QUERY, field_size=field_size)
+
+
+def load_query(data: bytes, backend: FieldBackend) -> Tuple[List[Vector], Vector, Vector]:
+    """
+    Load a query written by `dump_query`.
+
+    :param data: The serialized bytes, or any bytes-like object such as a memoryview of a mapped file.
+    :param backend: The field backend to store the query, which should use the same field.
+    :return: The query, a list of f vectors followed by the p and c vectors.
+    """
+    vectors = _load_kind(data, kind=QUERY, backend=backend)
+    return vectors[:-2], vectors[-2], vectors[-1]
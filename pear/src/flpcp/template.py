@@ -0,0 +1,75 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import List, Tuple
+
+# Declare some useful types, a sparse row is a list of (index, coefficient) pairs.
+SparseRow = List[Tuple[int, int]]
+
+# The kinds of weights of the slots of a ParallelSum gadget: padding, a G-gate summed as it is, and a G-gate weighted by
+# joint randomness, which is derived from the message by both the prover and the verifier.
+WEIGHT_ZERO = 0
+WEIGHT_ONE = 1
+WEIGHT_JOINT = 2
+
+
+@dataclass
+class QueryTemplate:
+    """
+    The deterministic parts of the FLPCP queries, which only depend on the configuration of a validator.
+
+    A query samples a random point r and one random mask per check, everything else is stored here:
+    - the wiring, where the G-gate j reads the message entry wire_positions[j - 1] and the i-th wire at point 0 reads
+      the constant at constant_positions[i],
+    - the checks, where the c vector is the sum over checks k of mask_k * (linear_checks[k] + sum of p(j) for all gates
+      j with gate_checks[j - 1] == k),
+    - the inverses of factorials [1/0!, ..., 1/num_gate!] to evaluate the Lagrange basis,
+    - the subproduct tree of (1 - j * t) over the G-gates j and the inverse series of their product, which turn the
+      masked sum of p(j) into weighted power sums of the gate points over the proof coefficients.
+
+    With a ParallelSum gadget of chunk length L, the j-th gadget call sums L G-gates, whose slots are stored in
+    wire_positions[(j - 1) * L:j * L] with -1 for padding, and the i-th wire of slot k reads the constant at
+    constant_positions[k * degree + i]. Each slot has a weight of kind slot_weights[(j - 1) * L + k], see the WEIGHT_*
+    constants, and the gate_checks are given per gadget call. Without a gadget chunk_length is 0 and each G-gate is
+    its own call with weight one.
+    """
+    field_size: int
+    total_size: int
+    proof_size: int
+    wire_positions: List[int]
+    constant_positions: List[int]
+    linear_checks: List[SparseRow]
+    gate_checks: List[int]
+    factorial_inverses: List[int]
+    gate_tree: List[List[List[int]]]
+    gate_denominator_inverse: List[int]
+    chunk_length: int = 0
+    slot_weights: List[int] = field(default_factory=list)
+
+    @property
+    def num_check(self) -> int:
+        """Return the number of checks, each needs a random mask."""
+        return len(self.linear_checks)
+
+    def save(self, path: str):
+        """
+        Save the template to a JSON file.
+
+        :param path: The path of the file to write.
+        """
+        with open(path, "w") as file:
+            json.dump(asdict(self), file)
+
+    @classmethod
+    def load(cls, path: str) -> "QueryTemplate":
+        """
+        Load a template from a JSON file written by `save`.
+
+        :param path: The path of the file to read.
+        :return: The loaded template.
+        """
+        with open(path) as file:
+            data = json.load(file)
+
+        # JSON does not keep tuples, convert the sparse rows back.
+        data["linear_checks"] = [[(index, coeff) for index, coeff in row] for row in data["linear_checks"]]
+        return cls(**data)
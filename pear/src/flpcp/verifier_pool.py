@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+from src.flpcp.base import FLPCP, CompactQuery, Proof, Query
+from src.flpcp.serialization import dump_proofs, load_proofs
+
+# The validator and query of a worker process, which are set once by the initializer.
+_worker_validator: Optional[FLPCP] = None
+_worker_query: Optional[Union[Query, CompactQuery]] = None
+
+
+@dataclass
+class VerificationResult:
+    """The decision on one proof, with the index of the proof and the time spent to verify it in seconds."""
+    index: int
+    accepted: bool
+    seconds: float
+
+
+def _init_worker(validator: FLPCP, query: Union[Query, CompactQuery, bytes], compact: bool):
+    """
+    Store the validator, including its query template, and the query in a worker process.
+
+    :param validator: The validator to verify with.
+    :param query: The verifier’s query shared by all proofs, or the seed to derive it from.
+    :param compact: If True, a seed is expanded by `query_gen_compact`, otherwise by `query_gen`.
+    """
+    global _worker_validator, _worker_query
+    _worker_validator = validator
+    if isinstance(query, bytes):
+        query = validator.query_gen_compact(seed=query) if compact else validator.query_gen(seed=query)
+    _worker_query = query
+
+
+def _verify_shard(start: int, data: bytes) -> List[VerificationResult]:
+    """
+    Verify a shard of proofs in a worker process.
+
+    :param start: The index of the first proof of the shard.
+    :param data: The proofs of the shard, serialized by `dump_proofs`.
+    :return: The result of each proof in the shard.
+    """
+    # A compact query is verified directly at r, which is the only way for a ParallelSum gadget.
+    verify = _worker_validator.verify_compact if isinstance(_worker_query, CompactQuery) else _worker_validator.verify
+
+    results = []
+    for index, proof in enumerate(load_proofs(data, _worker_validator.backend), start=start):
+        begin = time.perf_counter()
+        accepted = verify(proof=proof, query=_worker_query)
+        results.append(VerificationResult(index=index, accepted=accepted, seconds=time.perf_counter() - begin))
+
+    return results
+
+
+class VerifierPool:
+    """
+    A pool of processes verifying many proofs against the same query.
+
+    The validator and the query are sent to each worker once when it starts, a seeded query is sent as its seed and
+    expanded by each worker. The proofs are split into shards, which are sent to the workers in the compact wire
+    format, so the per-task cost is the size of the proofs only. A `CompactQuery` is verified with `verify_compact`,
+    which is required for validators with a ParallelSum gadget.
+    """
+
+    def __init__(
+            self, validator: FLPCP, query: Union[Query, CompactQuery, bytes], max_workers: Optional[int] = None,
+            shard_size: int = 256, compact: Optional[bool] = None
+    ):
+        """
+        Start the worker processes.
+
+        :param validator: The validator to verify with, any FLPCP construction.
+        :param query: The verifier’s query shared by all proofs, from `query_gen` or `query_gen_compact`, or the seed
+            given to either of them.
+        :param max_workers: The number of worker processes, by default the number of processors.
+        :param shard_size: The number of proofs sent to a worker in one task.
+        :param compact: If True, a seed is expanded by `query_gen_compact`, otherwise by `query_gen`. By default, the
+            compact query is used for validators with a ParallelSum gadget, which have no dense query, so a dense
+            query or compact=False raises a ValueError for them.
+        """
+        if compact is None:
+            compact = validator.chunk_length is not None
+
+        # Reject a dense query for a ParallelSum gadget here, rather than in each worker process.
+        dense = not compact if isinstance(query, bytes) else not isinstance(query, CompactQuery)
+        if dense and validator.chunk_length is not None:
+            raise ValueError("A validator with a ParallelSum gadget is only verified with a compact query.")
+
+        self._field_size = validator.field_size
+        self._shard_size = shard_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(validator, query, compact)
+        )
+
+    def _shards(self, proofs: List[Proof]) -> List[Tuple[int, bytes]]:
+        """
+        Split the proofs into serialized shards.
+
+        :param proofs: The proof vectors submitted by the provers.
+        :return: The index of the first proof and the serialized proofs of each shard.
+        """
+        return [
+            (start, dump_proofs(proofs[start:start + self._shard_size], self._field_size))
+            for start in range(0, len(proofs), self._shard_size)
+        ]
+
+    def verify(self, proofs: List[Proof]) -> List[VerificationResult]:
+        """
+        Verify many proofs in parallel.
+
+        :param proofs: The proof vectors submitted by the provers, all of the same size.
+        :return: The result of each proof, in the order of the proofs.
+        """
+        futures = [self._executor.submit(_verify_shard, start, data) for start, data in self._shards(proofs)]
+        return [result for future in futures for result in future.result()]
+
+    def close(self):
+        """Shut down the worker processes."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "VerifierPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
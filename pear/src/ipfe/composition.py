@@ -0,0 +1,170 @@
+from math import isqrt
+from typing import Tuple
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+# Declare some useful types, a form (a, b, c) is stored as a tuple of integers.
+Form = Tuple[int, int, int]
+
+
+def xgcd(a: int, b: int) -> Tuple[int, int, int]:
+    """
+    Compute the extended gcd of two integers.
+
+    :param a: An integer.
+    :param b: An integer.
+    :return: A tuple (g, x, y) such that g = gcd(a, b) = x * a + y * b.
+    """
+    # Use gmpy2 if it is installed, the results are converted back since mixing types slows down the other steps.
+    if gmpy2 is not None:
+        g, x, y = gmpy2.gcdext(a, b)
+        return int(g), int(x), int(y)
+
+    x0, y0, x1, y1 = 1, 0, 0, 1
+    while b:
+        q, r = divmod(a, b)
+        a, b = b, r
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+    if a < 0:
+        return -a, -x0, -y0
+    return a, x0, y0
+
+
+def partial_bound(disc: int) -> int:
+    """Return the bound |disc / 4|^(1/4) at which NUCOMP and NUDUPL stop the partial Euclidean reduction."""
+    return isqrt(isqrt(abs(int(disc)) // 4))
+
+
+def discriminant(f: Form) -> int:
+    """Return the discriminant b^2 - 4ac of a form."""
+    a, b, c = f
+    return b * b - 4 * a * c
+
+
+def normalize(f: Form) -> Form:
+    """Normalize a positive definite form, such that -a < b <= a."""
+    a, b, c = f
+    if -a < b <= a:
+        return f
+
+    r = (a - b) // (2 * a)
+    return a, b + 2 * r * a, a * r * r + b * r + c
+
+
+def reduce(f: Form) -> Form:
+    """Reduce a positive definite form, such that |b| <= a <= c and b >= 0 if |b| = a or a = c."""
+    a, b, c = normalize(f)
+    while a > c or (a == c and b < 0):
+        s = (c + b) // (2 * c)
+        a, b, c = c, -b + 2 * s * c, c * s * s - b * s + a
+
+    return normalize((a, b, c))
+
+
+def inverse(f: Form) -> Form:
+    """Return the reduced inverse of a reduced form."""
+    a, b, c = f
+    return reduce((a, -b, c))
+
+
+def _finish(v1: int, v2: int, r: int, b2: int, e: int, bound: int) -> Form:
+    """
+    Compute a nearly reduced form equivalent to the composite (v1 * v2, b2 + 2 * v2 * r, ...) and reduce it.
+
+    The composite maps (x, y) to (v2 * R^2 + b2 * R * y + e * y^2) / v1, where R = v1 * x + r * y. The Euclidean
+    algorithm on (v1, r) gives pairs (R, y) of decreasing R, it stops once the leading coefficient v2 * R^2 / v1 is
+    about the square root of the discriminant, and the two last pairs form the new basis. All intermediate values then
+    stay about the size of the square root of the discriminant.
+
+    :param v1: The first factor of the leading coefficient of the composite.
+    :param v2: The second factor of the leading coefficient of the composite.
+    :param r: The residue modulo v1 defining the middle coefficient of the composite.
+    :param b2: The middle coefficient of the second form.
+    :param e: The product d1 * c2, where d1 = a1 / v1 and c2 is the last coefficient of the second form.
+    :param bound: The bound returned by `partial_bound` for the discriminant.
+    :return: The reduced composite form.
+    """
+    # The basis starts as the identity, i.e. (R, y) = (v1, 0) and (r, 1), and the sign tracks its determinant.
+    r_u, y_u, r_w, y_w, sign = v1, 0, r, 1, 1
+    limit = v1 * bound * bound
+    while r_w != 0 and v2 * r_u * r_u > limit:
+        q, t = divmod(r_u, r_w)
+        r_u, y_u, r_w, y_w = r_w, y_w, t, y_u - q * y_w
+        sign = -sign
+
+    # Evaluate the composite on the basis, the second basis vector is negated for a negative determinant.
+    a = (v2 * r_u * r_u + b2 * r_u * y_u + e * y_u * y_u) // v1
+    b = (2 * v2 * r_u * r_w + b2 * (r_u * y_w + r_w * y_u) + 2 * e * y_u * y_w) // v1
+    c = (v2 * r_w * r_w + b2 * r_w * y_w + e * y_w * y_w) // v1
+    return reduce((a, sign * b, c))
+
+
+def nucomp(f1: Form, f2: Form, bound: int) -> Form:
+    """
+    Compose two forms of the same discriminant with Shanks' NUCOMP.
+
+    The composite is reduced while it is computed, so the intermediate coefficients stay about the size of the
+    square root of the discriminant instead of growing to the discriminant before the reduction.
+
+    :param f1: A primitive positive definite form.
+    :param f2: A primitive positive definite form with the same discriminant.
+    :param bound: The bound returned by `partial_bound` for the discriminant.
+    :return: The reduced composite form.
+    """
+    a1, b1, _ = f1
+    a2, b2, c2 = f2
+    if a1 > a2:
+        a1, b1, a2, b2, c2 = a2, b2, a1, b1, f1[2]
+
+    s = (b1 + b2) // 2
+    n = b2 - s
+
+    # Solve the linear congruences of the composition, as in Cohen's Algorithm 5.4.7.
+    if a2 % a1 == 0:
+        y1, d = 0, a1
+    else:
+        d, y1, _ = xgcd(a2, a1)
+    if s % d == 0:
+        x2, y2, d1 = 0, -1, d
+    else:
+        d1, x2, y2 = xgcd(s, d)
+        y2 = -y2
+
+    v1, v2 = a1 // d1, a2 // d1
+    r = (y1 * y2 * n - x2 * c2) % v1
+    return _finish(v1, v2, r, b2, d1 * c2, bound)
+
+
+def nudupl(f: Form, bound: int) -> Form:
+    """
+    Square a form with Shanks' NUDUPL, the specialization of NUCOMP to equal forms.
+
+    :param f: A primitive positive definite form.
+    :param bound: The bound returned by `partial_bound` for the discriminant.
+    :return: The reduced square form.
+    """
+    a, b, c = f
+
+    # Solve the linear congruence of the squaring.
+    d1, x2, _ = xgcd(b, a)
+    v = a // d1
+    r = (-x2 * c) % v
+    return _finish(v, v, r, b, d1 * c, bound)
+
+
+def compose(f1: Form, f2: Form, bound: int) -> Form:
+    """
+    Compose two reduced forms of the same discriminant, using NUDUPL for a square.
+
+    :param f1: A primitive positive definite form.
+    :param f2: A primitive positive definite form with the same discriminant.
+    :param bound: The bound returned by `partial_bound` for the discriminant.
+    :return: The reduced composite form.
+    """
+    if f1 == f2:
+        return nudupl(f1, bound)
+    return nucomp(f1, f2, bound)
@@ -0,0 +1,112 @@
+from math import isqrt
+from typing import Dict, Optional, Tuple
+
+from sage.quadratic_forms.binary_qf import BinaryQF
+
+from src.ipfe.composition import Form, compose, discriminant, inverse, partial_bound
+from src.ipfe.helper import binary_qf_to_form, form_pow
+
+# The default maximum number of baby steps, which bounds the memory of a decoder. Each entry takes about 220 bytes, so
+# the table stays below about 230 MB, and each giant step of a full table covers about 2^21 results.
+MAX_TABLE_SIZE = 2 ** 20
+
+
+class BSGSDecoder:
+    """
+    A baby-step giant-step decoder, which finds m in [lower, upper) such that base^m is a given form.
+
+    The baby steps base^j for 0 <= j <= size are stored once by their coefficients (a, b), reduced forms are unique
+    and the inverse of (a, b, c) is (a, -b, c), so one table lookup matches both base^j and base^(-j). Each giant step
+    then covers 2 * size + 1 values, and a decoder can be reused across any number of decryptions.
+
+    Building the table costs size compositions, and a decoding takes on average range / (4 * size) giant steps. So D
+    decodings cost about size + D * range / (4 * size) compositions, which is the least for size = sqrt(D * range) / 2,
+    and the table is larger the more decryptions are expected, up to the maximum table size.
+
+    The cap bounds what a decoding can cost. A giant step takes about 10 µs, so for a range of 2^40 the full default
+    table takes about 9 s to build, and a decoding still takes about 2^18 giant steps on average, about 3 s, and up to
+    2^19 steps, about 5 s. Decoding such a range in under a second on average needs max_table_size = 2^22, which takes
+    about 900 MB and 35 s to build. In general the decoding time scales with range / max_table_size.
+    """
+
+    def __init__(
+            self, base: BinaryQF, lower: int, upper: int, max_table_size: int = MAX_TABLE_SIZE, uses: int = 1
+    ):
+        """
+        Precompute the baby steps for a range of results.
+
+        :param base: The form encoding the value 1, e.g. `expo_f(p, delta_q, 1)` for the plaintext encoding of IPFE.
+        :param lower: The smallest result to search.
+        :param upper: The bound on the results to search, which is not included.
+        :param max_table_size: The maximum number of baby steps to store, the other steps are done as giant steps.
+            Each baby step takes about 220 bytes.
+        :param uses: The expected number of decodings, which trades the size of the table for their cost.
+        """
+        if upper <= lower:
+            raise ValueError("The range of results must not be empty.")
+
+        self._args = (base, lower, upper, max_table_size, uses)
+        self._base = binary_qf_to_form(base)
+        self._bound = partial_bound(discriminant(self._base))
+        self._lower = int(lower)
+        self._upper = int(upper)
+
+        # Balance the baby steps and the giant steps of all decodings, each giant step covers 2 * size + 1 values.
+        self._size = max(1, min(isqrt(max(uses, 1) * (self._upper - self._lower)) // 2 + 1, max_table_size))
+
+        # Store base^j for 0 <= j <= size, keyed by the first two coefficients.
+        self._table: Dict[Tuple[int, int], int] = {}
+        form = form_pow(self._base, 0)
+        for j in range(self._size + 1):
+            self._table.setdefault((form[0], form[1]), j)
+            form = compose(form, self._base, self._bound)
+
+        # The giant step multiplies by base^(-(2 * size + 1)).
+        self._giant = inverse(form_pow(self._base, 2 * self._size + 1))
+
+    def __reduce__(self):
+        """Pickle the decoder by its parameters, so that a worker process builds its own table instead of copying it."""
+        return BSGSDecoder, self._args
+
+    @property
+    def table_size(self) -> int:
+        """Return the number of stored baby steps."""
+        return len(self._table)
+
+    def _lookup(self, form: Form) -> Optional[int]:
+        """Return j with |j| <= size such that base^j is the given form, or None."""
+        a, b, _ = form
+        if (a, b) in self._table:
+            return self._table[(a, b)]
+        if (a, -b) in self._table:
+            return -self._table[(a, -b)]
+        return None
+
+    def decode_form(self, target: Form) -> Optional[int]:
+        """
+        Find the result encoded by a reduced form on plain integers.
+
+        :param target: The reduced form base^m.
+        :return: The integer m in [lower, upper), or None if there is none.
+        """
+        # Shift the target, such that the first giant step is centered on lower + size.
+        center = self._lower + self._size
+        form = compose(target, form_pow(self._base, -center), self._bound)
+
+        while center - self._size < self._upper:
+            j = self._lookup(form)
+            if j is not None and self._lower <= center + j < self._upper:
+                return center + j
+            form = compose(form, self._giant, self._bound)
+            center += 2 * self._size + 1
+
+        return None
+
+    def decode(self, target: BinaryQF) -> Optional[int]:
+        """
+        Find the result encoded by a form.
+
+        :param target: The form base^m.
+        :return: The integer m in [lower, upper), or None if there is none.
+        """
+        return self.decode_form(binary_qf_to_form(target))
@@ -0,0 +1,181 @@
+import struct
+from math import isqrt
+from typing import Iterable, Iterator, List, Union
+
+from sage.quadratic_forms.binary_qf import BinaryQF
+
+from src.ipfe.composition import Form, compose, discriminant, inverse, nudupl, partial_bound, reduce
+from src.ipfe.helper import form_pow
+
+# The serialized array starts with a fixed header: magic, version, element width, number of forms, discriminant width.
+# It is followed by the discriminant, then the a coefficients and the b coefficients of all forms.
+MAGIC = b"QFAR"
+VERSION = 1
+HEADER = struct.Struct("<4sBHIH")
+
+
+def _signed_size(x: int) -> int:
+    """Return the number of bytes to store integers of absolute value at most x in two's complement."""
+    return (int(x).bit_length() + 8) // 8
+
+
+class FormArray:
+    """
+    A compact array of reduced forms of the same discriminant.
+
+    Each form (a, b, c) is stored as its first two coefficients, since c = (b^2 - disc) / (4a). The coefficients a and b
+    are kept in two contiguous buffers of fixed-width little-endian integers, whose width only depends on the
+    discriminant, as a reduced form satisfies |b| <= a <= sqrt(|disc| / 3).
+
+    The array saves memory and serialization, not arithmetic: the elementwise operations compose the forms one at a
+    time with NUCOMP and NUDUPL.
+    """
+
+    def __init__(self, disc: int, forms: Iterable[Union[Form, BinaryQF]] = ()):
+        """
+        Create an array of forms, the forms are reduced when they are added.
+
+        :param disc: The negative discriminant of all forms.
+        :param forms: The initial forms, as tuples of integers or BinaryQF.
+        """
+        self._disc = int(disc)
+        self._bound = partial_bound(self._disc)
+        self._width = _signed_size(isqrt(abs(self._disc) // 3) + 1)
+        self._a = bytearray()
+        self._b = bytearray()
+        self.extend(forms)
+
+    @property
+    def discriminant(self) -> int:
+        """Return the discriminant of all forms."""
+        return self._disc
+
+    @property
+    def nbytes(self) -> int:
+        """Return the number of bytes of the coefficient buffers."""
+        return len(self._a) + len(self._b)
+
+    def __len__(self) -> int:
+        return len(self._a) // self._width
+
+    def __getitem__(self, i: int) -> Form:
+        """Return the i-th form as a tuple of integers."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("FormArray index out of range")
+
+        start, end = i * self._width, (i + 1) * self._width
+        a = int.from_bytes(self._a[start:end], "little", signed=True)
+        b = int.from_bytes(self._b[start:end], "little", signed=True)
+        return a, b, (b * b - self._disc) // (4 * a)
+
+    def __iter__(self) -> Iterator[Form]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FormArray):
+            return NotImplemented
+        return self._disc == other._disc and self._a == other._a and self._b == other._b
+
+    def _check_reduced(self, a: int, b: int):
+        """
+        Check that the coefficients (a, b) are the ones of a reduced form of the discriminant of the array.
+
+        :param a: The first coefficient.
+        :param b: The second coefficient.
+        """
+        if a <= 0 or (b * b - self._disc) % (4 * a):
+            raise ValueError(f"The coefficients ({a}, {b}) are not a form of discriminant {self._disc}.")
+
+        c = (b * b - self._disc) // (4 * a)
+        if not (-a < b <= a and a <= c and (b >= 0 or a != c)):
+            raise ValueError(f"The form ({a}, {b}, {c}) is not reduced.")
+
+    def append(self, form: Union[Form, BinaryQF]):
+        """
+        Reduce a form and add it to the end of the array.
+
+        :param form: A positive definite form of the discriminant of the array, as a tuple of integers or a BinaryQF.
+        """
+        form = (int(form[0]), int(form[1]), int(form[2]))
+        if form[0] <= 0 or discriminant(form) != self._disc:
+            raise ValueError(f"The form {form} is not a positive definite form of discriminant {self._disc}.")
+
+        a, b, _ = reduce(form)
+        self._a += a.to_bytes(self._width, "little", signed=True)
+        self._b += b.to_bytes(self._width, "little", signed=True)
+
+    def extend(self, forms: Iterable[Union[Form, BinaryQF]]):
+        """Reduce forms and add them to the end of the array."""
+        for form in forms:
+            self.append(form)
+
+    def to_binary_qfs(self) -> List[BinaryQF]:
+        """Return the forms as a list of BinaryQF."""
+        return [BinaryQF(list(form)) for form in self]
+
+    def compose(self, other: "FormArray") -> "FormArray":
+        """
+        Compose the forms of two arrays elementwise.
+
+        :param other: An array of the same length and discriminant.
+        :return: The array of reduced composite forms.
+        """
+        if other._disc != self._disc or len(other) != len(self):
+            raise ValueError("The arrays must have the same discriminant and length.")
+
+        return FormArray(self._disc, (compose(f, g, self._bound) for f, g in zip(self, other)))
+
+    def square(self) -> "FormArray":
+        """Return the array of reduced squares of the forms."""
+        return FormArray(self._disc, (nudupl(f, self._bound) for f in self))
+
+    def inverse(self) -> "FormArray":
+        """Return the array of inverses of the forms."""
+        return FormArray(self._disc, (inverse(f) for f in self))
+
+    def pow(self, n: int) -> "FormArray":
+        """Return the array of the forms raised to the power n, which may be zero or negative."""
+        return FormArray(self._disc, (form_pow(f, n) for f in self))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the array to bytes."""
+        disc_size = _signed_size(self._disc)
+        header = HEADER.pack(MAGIC, VERSION, self._width, len(self), disc_size)
+        return header + self._disc.to_bytes(disc_size, "little", signed=True) + bytes(self._a) + bytes(self._b)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FormArray":
+        """
+        Load an array written by `to_bytes`.
+
+        :param data: The serialized bytes.
+        :return: The array of forms.
+        """
+        data = memoryview(data)
+        magic, version, width, count, disc_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("The data is not a serialized FormArray of a supported version.")
+
+        offset = HEADER.size + disc_size
+        if len(data) < offset + 2 * count * width:
+            raise ValueError("The data is shorter than the size given by its header.")
+
+        array = cls(int.from_bytes(data[HEADER.size:offset], "little", signed=True))
+        if array._width != width:
+            raise ValueError("The element width does not match the discriminant.")
+        if array._disc >= 0 or array._disc % 4 not in (0, 1):
+            raise ValueError("The discriminant is not negative or not 0 or 1 modulo 4.")
+
+        # The buffers are copied as they are, after checking that each form is reduced as when it was stored.
+        array._a = bytearray(data[offset:offset + count * width])
+        array._b = bytearray(data[offset + count * width:offset + 2 * count * width])
+        for i in range(count):
+            start, end = i * width, (i + 1) * width
+            array._check_reduced(
+                int.from_bytes(array._a[start:end], "little", signed=True),
+                int.from_bytes(array._b[start:end], "little", signed=True)
+            )
+        return array
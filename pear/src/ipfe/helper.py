@@ -1,6 +1,17 @@
+from functools import lru_cache
+from math import ceil
+from typing import List, Optional, Tuple
+
 from sage.arith.misc import inverse_mod, is_prime
 from sage.quadratic_forms.binary_qf import BinaryQF
 
+from src.ipfe.composition import Form, compose, discriminant, inverse, nucomp, nudupl, partial_bound, reduce
+
+# The number of forms from which the multi-exponentiation switches from Straus to Pippenger.
+PIPPENGER_THRESHOLD = 32
+# The number of plaintext forms kept by the cache of `expo_f_form`.
+EXPO_F_CACHE_SIZE = 4096
+
 
 def mod_floor(a: int, b: int) -> int:
     """Compute a mod b with floor division semantics: result r satisfies 0 <= r < |b|."""
@@ -41,27 +52,265 @@ def construct_binary_qf_from_principle(delta: int) -> BinaryQF:
     return construct_binary_qf(a=1, b=1, delta=delta)
 
 
-def binary_qf_pow(f: BinaryQF, n: int) -> BinaryQF:
-    """Raise binary quadratic form f to the power n via repeated composition."""
+def binary_qf_to_form(f: BinaryQF) -> Form:
+    """Convert a BinaryQF to a reduced form on plain integers."""
+    return reduce((int(f[0]), int(f[1]), int(f[2])))
+
+
+def form_to_binary_qf(f: Form) -> BinaryQF:
+    """Convert a form on plain integers to a BinaryQF."""
+    return BinaryQF(list(f))
+
+
+def _principal(disc: int) -> Form:
+    """Return the principal form of a discriminant on plain integers."""
+    return binary_qf_to_form(BinaryQF.principal(disc))
+
+
+def _compose(f: Optional[Form], g: Form, bound: int) -> Form:
+    """Compose two forms with NUCOMP or NUDUPL, where None stands for the principal form."""
+    return g if f is None else compose(f, g, bound)
+
+
+def _window_size(bits: int) -> int:
+    """Choose the wNAF window size minimizing the precomputed odd powers plus the expected nonzero digits."""
+    return min(range(2, 9), key=lambda w: 2 ** (w - 2) + bits / (w + 1))
+
+
+def _wnaf(n: int, w: int) -> List[int]:
+    """
+    Compute the width-w non-adjacent form of a non-negative integer.
+
+    :param n: The integer to convert.
+    :param w: The window size, at least 2.
+    :return: The digits from the least significant one, each zero or odd with absolute value less than 2^(w - 1).
+    """
+    digits = []
+    while n > 0:
+        digit = 0
+        if n & 1:
+            digit = n & ((1 << w) - 1)
+            if digit >= 1 << (w - 1):
+                digit -= 1 << w
+            n -= digit
+        digits.append(digit)
+        n >>= 1
+
+    return digits
+
+
+def _odd_powers(f: Form, w: int, bound: int) -> Tuple[List[Form], List[Form]]:
+    """
+    Precompute the odd powers of f used by the wNAF digits, inverses are free in the class group.
+
+    :param f: The reduced base form.
+    :param w: The window size.
+    :param bound: The partial reduction bound of the discriminant.
+    :return: The forms f^1, f^3, ..., f^(2^(w - 1) - 1) and their inverses.
+    """
+    powers = [f]
+    if w > 2:
+        square = nudupl(f, bound)
+        for _ in range(2 ** (w - 2) - 1):
+            powers.append(nucomp(powers[-1], square, bound))
+
+    return powers, [inverse(power) for power in powers]
+
+
+def _pow(f: Form, n: int, bound: int) -> Form:
+    """Raise a reduced form to a positive power n with sliding windows over the wNAF of n."""
+    w = _window_size(n.bit_length())
+    powers, inverses = _odd_powers(f, w, bound)
+
+    # Scan the digits from the most significant one, the leading digit is always positive.
+    result = None
+    for digit in reversed(_wnaf(n, w)):
+        if result is not None:
+            result = nudupl(result, bound)
+        if digit > 0:
+            result = _compose(result, powers[digit // 2], bound)
+        elif digit < 0:
+            result = _compose(result, inverses[-digit // 2], bound)
+
+    return result
+
+
+def form_pow(f: Form, n: int) -> Form:
+    """Raise a reduced form on plain integers to the power n, which may be zero or negative."""
+    n = int(n)
     if n == 0:
+        return _principal(discriminant(f))
+    if n < 0:
+        f, n = inverse(f), -n
+
+    return _pow(f, n, partial_bound(discriminant(f)))
+
+
+def binary_qf_pow(f: BinaryQF, n: int) -> BinaryQF:
+    """Raise binary quadratic form f to the power n with sliding windows over the wNAF of n."""
+    if n <= 0:
         raise ValueError("n must be a positive integer")
 
-    result = BinaryQF.principal(f.discriminant())
-    base = f
+    form = binary_qf_to_form(f)
+    return form_to_binary_qf(_pow(form, int(n), partial_bound(discriminant(form))))
+
+
+def binary_qf_compose(f: BinaryQF, g: BinaryQF) -> BinaryQF:
+    """Compose two binary quadratic forms of the same discriminant and reduce the result."""
+    form = binary_qf_to_form(f)
+    return form_to_binary_qf(compose(form, binary_qf_to_form(g), partial_bound(discriminant(form))))
+
+
+def _straus(forms: List[Form], exponents: List[int], bound: int) -> Optional[Form]:
+    """Compute the product of f_i^e_i for positive e_i with interleaved wNAF, sharing the squarings."""
+    tables, digits = [], []
+    for f, e in zip(forms, exponents):
+        w = _window_size(e.bit_length())
+        tables.append(_odd_powers(f, w, bound))
+        digits.append(_wnaf(e, w))
+
+    result = None
+    for k in range(max(len(d) for d in digits) - 1, -1, -1):
+        if result is not None:
+            result = nudupl(result, bound)
+        for (powers, inverses), d in zip(tables, digits):
+            if k < len(d) and d[k] > 0:
+                result = _compose(result, powers[d[k] // 2], bound)
+            elif k < len(d) and d[k] < 0:
+                result = _compose(result, inverses[-d[k] // 2], bound)
+
+    return result
 
-    # Optimize the exponentiation.
-    while n > 0:
-        if n % 2 == 1:
-            result = (result * base).reduced_form()
-        base = (base * base).reduced_form()
-        n //= 2
+
+def _pippenger(forms: List[Form], exponents: List[int], bound: int) -> Optional[Form]:
+    """Compute the product of f_i^e_i for positive e_i with the bucket method over windows of the exponents."""
+    bits = max(e.bit_length() for e in exponents)
+    c = max(1, (len(forms).bit_length() - 1) // 2 + 1)
+    mask = (1 << c) - 1
+
+    result = None
+    for shift in range((bits - 1) // c * c, -1, -c):
+        # Raise the partial result to the power 2^c.
+        if result is not None:
+            for _ in range(c):
+                result = nudupl(result, bound)
+
+        # Put each form into the bucket of its window digit.
+        buckets: List[Optional[Form]] = [None] * (mask + 1)
+        for f, e in zip(forms, exponents):
+            digit = (e >> shift) & mask
+            if digit:
+                buckets[digit] = _compose(buckets[digit], f, bound)
+
+        # The product of bucket_k^k is the product of the running products from the top bucket down.
+        running, total = None, None
+        for bucket in reversed(buckets[1:]):
+            if bucket is not None:
+                running = _compose(running, bucket, bound)
+            if running is not None:
+                total = _compose(total, running, bound)
+        if total is not None:
+            result = _compose(result, total, bound)
 
     return result
 
 
+def binary_qf_multi_pow(forms: List[BinaryQF], exponents: List[int]) -> BinaryQF:
+    """
+    Compute the product of f_i^e_i in one pass, instead of exponentiating each form separately.
+
+    Few forms use the interleaved wNAF method of Straus and many forms use the bucket method of Pippenger, both share
+    the squarings across all forms.
+
+    :param forms: The base forms, all with the same discriminant.
+    :param exponents: The exponents, which may be zero or negative.
+    :return: The reduced product form.
+    """
+    disc = int(forms[0].discriminant())
+    bound = partial_bound(disc)
+
+    # Negative exponents invert the base, and zero exponents are dropped.
+    pairs = [(binary_qf_to_form(f), int(e)) for f, e in zip(forms, exponents) if e != 0]
+    pairs = [(f if e > 0 else inverse(f), abs(e)) for f, e in pairs]
+    if not pairs:
+        return form_to_binary_qf(_principal(disc))
+
+    if len(pairs) < PIPPENGER_THRESHOLD:
+        return form_to_binary_qf(_straus([f for f, _ in pairs], [e for _, e in pairs], bound))
+
+    # The windows of Pippenger cover the longest exponent, so exponents much longer than the typical one, such as the
+    # secret key in decryption, are handled by Straus instead.
+    typical = sorted(e.bit_length() for _, e in pairs)[len(pairs) // 2]
+    short = [(f, e) for f, e in pairs if e.bit_length() <= 2 * typical]
+    long = [(f, e) for f, e in pairs if e.bit_length() > 2 * typical]
+
+    result = _pippenger([f for f, _ in short], [e for _, e in short], bound)
+    if long:
+        result = _compose(result, _straus([f for f, _ in long], [e for _, e in long], bound), bound)
+    return form_to_binary_qf(result)
+
+
+class FixedBaseTable:
+    """
+    A precomputed table to raise a fixed form to many exponents.
+
+    With a window of w bits, row j holds g^(d * 2^(w * j)) for all digits d in [1, 2^w), so g^n is the product of one
+    entry per window of n, without any squaring.
+    """
+
+    def __init__(self, f: BinaryQF, bits: int, uses: int = 16):
+        """
+        Build the table for exponents of at most a given bit length.
+
+        :param f: The fixed base form.
+        :param bits: The bit length of the largest exponent, longer exponents fall back to `binary_qf_pow`.
+        :param uses: The expected number of exponentiations, which trades the size of the table for their cost.
+        """
+        self._base = binary_qf_to_form(f)
+        self._disc = discriminant(self._base)
+        self._bound = partial_bound(self._disc)
+        self._bits = max(int(bits), 1)
+        # Minimize the compositions to build the table plus the expected compositions of all the exponentiations.
+        self._window = min(
+            range(1, 9), key=lambda w: ceil(self._bits / w) * (2 ** w - 1 + uses * (1 - 2 ** -w))
+        )
+
+        # Each row starts from the last entry of the previous row composed with its base, i.e. g^(2^(w * j)).
+        self._rows: List[List[Optional[Form]]] = []
+        base = self._base
+        for _ in range(ceil(self._bits / self._window)):
+            row = [None, base]
+            for _ in range(2 ** self._window - 2):
+                row.append(compose(row[-1], base, self._bound))
+            self._rows.append(row)
+            base = compose(row[-1], base, self._bound)
+
+    def pow_form(self, n: int) -> Form:
+        """Raise the base form to the power n, which may be zero or negative, and return it on plain integers."""
+        n = int(n)
+        if n < 0:
+            return inverse(self.pow_form(-n))
+        if n == 0:
+            return _principal(self._disc)
+        if n.bit_length() > self._bits:
+            return _pow(self._base, n, self._bound)
+
+        result, mask = None, 2 ** self._window - 1
+        for row in self._rows:
+            if n & mask:
+                result = _compose(result, row[n & mask], self._bound)
+            n >>= self._window
+
+        return result
+
+    def pow(self, n: int) -> BinaryQF:
+        """Raise the base form to the power n, which may be zero or negative."""
+        return form_to_binary_qf(self.pow_form(n))
+
+
 def binary_qf_inverse(f: BinaryQF) -> BinaryQF:
     """Find the inverse of a binary quadratic form f."""
-    return BinaryQF([f[0], -f[1], f[2]]).reduced_form()
+    return form_to_binary_qf(inverse(binary_qf_to_form(f)))
 
 
 def phi_q_inverse(f: BinaryQF, conductor: int) -> BinaryQF:
@@ -87,6 +336,12 @@ def expo_f(p: int, delta: int, k: int) -> BinaryQF:
     return construct_binary_qf(a, b, delta)
 
 
+@lru_cache(maxsize=EXPO_F_CACHE_SIZE)
+def expo_f_form(p: int, delta: int, k: int) -> Form:
+    """Return the reduced form f^k of `expo_f` on plain integers, memoized since plaintexts often repeat values."""
+    return binary_qf_to_form(expo_f(p, delta, k))
+
+
 def discrete_log_f(p: int, delta: int, c: BinaryQF) -> int:
     """Recover exponent x from form c = f^x, where f is the generator constructed from (p, delta)."""
     principal_qf = construct_binary_qf_from_principle(delta)
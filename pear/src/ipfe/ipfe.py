@@ -1,13 +1,26 @@
+import json
+import os
 import random
-from dataclasses import dataclass
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from math import ceil, floor
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from sage.arith.misc import random_prime, kronecker, next_prime
 from sage.misc.functional import log, sqrt
+from sage.rings.integer import Integer
 from sage.quadratic_forms.binary_qf import BinaryQF
 
-from src.ipfe.helper import prime_form, phi_q_inverse, binary_qf_pow, expo_f, binary_qf_inverse, discrete_log_f
+from src.flpcp.base import Randomness, sample_batch
+from src.ipfe.composition import Form, compose, partial_bound
+from src.ipfe.decoder import BSGSDecoder
+from src.ipfe.form_array import FormArray
+from src.ipfe.helper import (
+    FixedBaseTable, prime_form, phi_q_inverse, binary_qf_compose, binary_qf_pow, binary_qf_multi_pow,
+    binary_qf_to_form, construct_binary_qf, discrete_log_f, expo_f_form, form_pow, form_to_binary_qf
+)
 
 
 @dataclass
@@ -19,15 +32,96 @@ class PK:
     lambda_bits: int
     gp: BinaryQF
     vec_h: List[BinaryQF]
+    # The optional fixed-base tables of gp (index 0) and vec_h[i] (index i + 1), which are built by `precompute`.
+    tables: Dict[int, FixedBaseTable] = field(default_factory=dict, repr=False, compare=False)
 
+    @property
+    def s_bound(self) -> int:
+        """Return the bound of the master secret key entries s."""
+        return int(floor(self.s_tilde * sqrt(2 * self.lambda_bits) * Integer(self.p) ** 1.5))
 
-def param_gen(mu_bits: int, lambda_bits: int, length: int) -> Tuple[List[int], PK]:
+    @property
+    def r_bound(self) -> int:
+        """Return the bound of the randomness r sampled by encryption."""
+        return int(floor(self.s_tilde * sqrt(self.lambda_bits)))
+
+    def precompute(self, uses: int):
+        """
+        Build the fixed-base tables of the bases raised by encryption, which later encryptions use instead of
+        exponentiations. A table pays off from about two exponentiations of its base.
+
+        :param uses: The expected number of encryptions, which trades the size of the tables for their cost.
+        """
+        self.tables = tables_gen(self, uses)
+
+    def clear_tables(self):
+        """Free the fixed-base tables, encryptions fall back to exponentiations."""
+        self.tables = {}
+
+
+def tables_gen(mpk: PK, uses: int) -> Dict[int, FixedBaseTable]:
+    """
+    Build the fixed-base tables of gp and of each entry of vec_h, for exponents up to the bound of r.
+
+    :param mpk: The public key.
+    :param uses: The expected number of exponentiations of each base.
+    :return: The tables of gp (index 0) and vec_h[i] (index i + 1).
+    """
+    bits = mpk.r_bound.bit_length()
+    return {index: FixedBaseTable(base, bits=bits, uses=uses) for index, base in enumerate([mpk.gp] + mpk.vec_h)}
+
+
+def _base_pow(mpk: PK, tables: Dict[int, FixedBaseTable], index: int, r: int) -> Form:
+    """
+    Raise a base of the public key to the power r, with its fixed-base table if there is one.
+
+    :param mpk: The public key.
+    :param tables: The fixed-base tables, possibly empty.
+    :param index: 0 for gp and i + 1 for vec_h[i].
+    :param r: The exponent.
+    :return: The reduced form on plain integers.
+    """
+    if index in tables:
+        return tables[index].pow_form(r)
+    return form_pow(binary_qf_to_form(mpk.gp if index == 0 else mpk.vec_h[index - 1]), r)
+
+
+@dataclass
+class CiphertextBatch:
+    """
+    Many ciphertexts under the same public key, stored compactly.
+
+    The components of all ciphertexts are kept in one FormArray, where the k-th ciphertext [c_0, c_1, ..., c_n] is
+    the k-th run of `width` = n + 1 forms.
+    """
+    forms: FormArray
+    width: int
+
+    def __len__(self) -> int:
+        return len(self.forms) // self.width
+
+    def __getitem__(self, k: int) -> List[BinaryQF]:
+        """Return the k-th ciphertext as a list of BinaryQF, which can be passed to `decrypt`."""
+        return [form_to_binary_qf(self.forms[k * self.width + i]) for i in range(self.width)]
+
+    def to_bytes(self) -> bytes:
+        """Serialize the batch to bytes."""
+        return struct.pack("<I", self.width) + self.forms.to_bytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CiphertextBatch":
+        """Load a batch written by `to_bytes`."""
+        return cls(forms=FormArray.from_bytes(memoryview(data)[4:]), width=struct.unpack_from("<I", data)[0])
+
+
+def param_gen(mu_bits: int, lambda_bits: int, length: int, rng: Randomness = random) -> Tuple[List[int], PK]:
     """
     Generate parameters for the inner product functional encryption scheme.
 
     :param mu_bits: Bit-length of the small prime p.
     :param lambda_bits: Bit-length for the security parameter.
     :param length: Dimension of the input/output vectors.
+    :param rng: The source of randomness of the master secret key, e.g. an `XofRandom`, by default `random`.
     :return: A tuple containing the secret key vector and the public key.
     """
     # Check for desired condition.
@@ -60,46 +154,259 @@ def param_gen(mu_bits: int, lambda_bits: int, length: int) -> Tuple[List[int], P
     r_goth = prime_form(delta_k, r)
 
     # Compute the reduced r_goth squared.
-    r_goth_sq = (r_goth * r_goth).reduced_form()
+    r_goth_sq = binary_qf_compose(r_goth, r_goth)
 
     # Compute the gq generator.
     gp_tmp = phi_q_inverse(r_goth_sq, p).reduced_form()
     gp = binary_qf_pow(gp_tmp, p)
 
-    # Set the bound to sample the randomness.
-    bound = floor(s_tilde * sqrt(2 * lambda_bits) * p ** 1.5)
+    # Sample the master secret key and compute the h vector.
+    mpk = PK(p=p, delta_q=delta_q, s_tilde=s_tilde, lambda_bits=lambda_bits, gp=gp, vec_h=[])
+    return extend_keys(msk=[], mpk=mpk, length=length, rng=rng)
+
 
+def extend_keys(msk: List[int], mpk: PK, length: int, rng: Randomness = random) -> Tuple[List[int], PK]:
+    """
+    Extend the keys to a longer dimension, by sampling new secret entries in the same group.
+
+    :param msk: The master secret key vector.
+    :param mpk: The public key, whose h vector has the same length as msk.
+    :param length: The new dimension of the input/output vectors, at least the current one.
+    :param rng: The source of randomness of the new secret entries.
+    :return: A tuple containing the extended secret key vector and the extended public key.
+    """
     # Sample the random values.
-    vec_s = [random.randint(0, bound) for _ in range(length)]
+    bound = mpk.s_bound
+    vec_s = sample_batch(rng, length - len(msk), 0, bound + 1)
+
+    # Compute the h vector with a fixed-base table of gp.
+    table = FixedBaseTable(mpk.gp, bits=bound.bit_length(), uses=len(vec_s))
+    vec_h = [table.pow(s) for s in vec_s]
+
+    # Return the secret key and the public key, the tables of existing bases stay valid.
+    extended = PK(
+        p=mpk.p, delta_q=mpk.delta_q, s_tilde=mpk.s_tilde, lambda_bits=mpk.lambda_bits, gp=mpk.gp,
+        vec_h=mpk.vec_h + vec_h, tables=dict(mpk.tables)
+    )
+    return msk + vec_s, extended
 
-    # Compute the h vector.
-    vec_h = [binary_qf_pow(gp, s) for s in vec_s]
 
-    # Return the secret key and the public key.
-    return vec_s, PK(p=p, delta_q=delta_q, s_tilde=s_tilde, lambda_bits=lambda_bits, gp=gp, vec_h=vec_h)
+def save_keys(path: str, msk: List[int], mpk: PK):
+    """
+    Save the master secret key and the public key to a JSON file, each form is stored as its coefficients (a, b).
+
+    The file contains the master secret key, so it is only readable and writable by its owner.
 
+    :param path: The path of the file to write.
+    :param msk: The master secret key vector.
+    :param mpk: The public key.
+    """
+    data = {
+        "p": int(mpk.p),
+        "delta_q": int(mpk.delta_q),
+        "s_tilde": int(mpk.s_tilde),
+        "lambda_bits": int(mpk.lambda_bits),
+        "gp": [int(mpk.gp[0]), int(mpk.gp[1])],
+        "vec_h": [[int(h[0]), int(h[1])] for h in mpk.vec_h],
+        "msk": [int(s) for s in msk],
+    }
+
+    # Create the file with owner-only permissions, and restrict an existing file before writing to it.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "w") as file:
+        json.dump(data, file)
+
+
+def load_keys(path: str) -> Tuple[List[int], PK]:
+    """
+    Load the keys from a JSON file written by `save_keys`.
 
-def encrypt(mpk: PK, y_vec: List[int]):
+    :param path: The path of the file to read.
+    :return: A tuple containing the secret key vector and the public key.
+    """
+    with open(path) as file:
+        data = json.load(file)
+
+    # Rebuild the forms from their coefficients (a, b) and the discriminant.
+    delta_q = data["delta_q"]
+    mpk = PK(
+        p=Integer(data["p"]),
+        delta_q=delta_q,
+        s_tilde=Integer(data["s_tilde"]),
+        lambda_bits=data["lambda_bits"],
+        gp=construct_binary_qf(*data["gp"], delta=delta_q),
+        vec_h=[construct_binary_qf(a, b, delta_q) for a, b in data["vec_h"]]
+    )
+    return data["msk"], mpk
+
+
+def param_gen_cached(mu_bits: int, lambda_bits: int, length: int, cache_dir: str) -> Tuple[List[int], PK]:
+    """
+    Generate parameters as `param_gen`, reusing the keys saved in a cache directory.
+
+    The keys are cached per (mu_bits, lambda_bits, length). On a miss, the cached keys of the same group with the
+    shortest longer length are truncated, otherwise the ones with the longest shorter length are extended, and only
+    without any of them a new group is generated. The keys of different lengths thus share their first entries.
+
+    :param mu_bits: Bit-length of the small prime p.
+    :param lambda_bits: Bit-length for the security parameter.
+    :param length: Dimension of the input/output vectors.
+    :param cache_dir: The directory of the cached keys, which contain master secret keys.
+    :return: A tuple containing the secret key vector and the public key.
+    """
+    def cache_path(n: int) -> str:
+        return os.path.join(cache_dir, f"ipfe_{mu_bits}_{lambda_bits}_{n}.json")
+
+    if os.path.exists(cache_path(length)):
+        return load_keys(cache_path(length))
+
+    # Find the lengths of the cached keys of the same group.
+    prefix, cached = f"ipfe_{mu_bits}_{lambda_bits}_", []
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith(".json") and name[len(prefix):-5].isdigit():
+                cached.append(int(name[len(prefix):-5]))
+    longer = [n for n in cached if n > length]
+    shorter = [n for n in cached if n < length]
+
+    if longer:
+        # The first entries of longer keys are keys of the given length.
+        msk, mpk = load_keys(cache_path(min(longer)))
+        msk, mpk.vec_h = msk[:length], mpk.vec_h[:length]
+    elif shorter:
+        msk, mpk = extend_keys(*load_keys(cache_path(max(shorter))), length=length)
+    else:
+        msk, mpk = param_gen(mu_bits=mu_bits, lambda_bits=lambda_bits, length=length)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    save_keys(cache_path(length), msk, mpk)
+    return msk, mpk
+
+
+def encrypt(mpk: PK, y_vec: List[int], rng: Randomness = random):
     """
     Encrypt a vector y under the public key.
 
     :param mpk: The public key.
     :param y_vec: The plaintext input vector to encrypt.
+    :param rng: The source of randomness of r.
     :return: A ciphertext consisting of [c_0, c_1, ..., c_n], each as a BinaryQF.
     """
     # First sample a random r.
-    bound = floor(mpk.s_tilde * sqrt(mpk.lambda_bits))
-    r = random.randint(0, bound)
+    r = rng.randint(0, mpk.r_bound)
 
-    # Compute c_0.
-    c_0 = binary_qf_pow(mpk.gp, r)
+    # Compute c_0, with the fixed-base tables of the public key if `PK.precompute` built them.
+    c_0 = form_to_binary_qf(_base_pow(mpk, mpk.tables, 0, r))
 
     # Compute C vector.
-    c_vec = [expo_f(mpk.p, mpk.delta_q, y) * binary_qf_pow(mpk.vec_h[i], r) for i, y in enumerate(y_vec)]
+    c_vec = [form_to_binary_qf(_encrypt_component(mpk, mpk.tables, i, y, r)) for i, y in enumerate(y_vec)]
 
     return [c_0] + c_vec
 
 
+def _encrypt_component(mpk: PK, tables: Dict[int, FixedBaseTable], index: int, y: int, r: int) -> Form:
+    """
+    Compute the ciphertext component f^y * h_index^r as a form on plain integers.
+
+    :param mpk: The public key.
+    :param tables: The fixed-base tables of the public key, possibly empty.
+    :param index: The index of the coordinate.
+    :param y: The plaintext value of the coordinate.
+    :param r: The randomness of the ciphertext.
+    :return: The reduced component form.
+    """
+    return compose(expo_f_form(mpk.p, mpk.delta_q, y), _base_pow(mpk, tables, index + 1, r), partial_bound(mpk.delta_q))
+
+
+def _encrypt_columns(
+        mpk: PK, tables: Dict[int, FixedBaseTable], indices: List[int], columns: List[List[int]], r_vec: List[int]
+) -> List[List[Form]]:
+    """
+    Compute the ciphertext components of some coordinates for all plaintext vectors of a batch.
+
+    :param mpk: The public key.
+    :param tables: The fixed-base tables of the public key, possibly empty.
+    :param indices: The indices of the coordinates.
+    :param columns: The plaintext values of each coordinate, one per vector.
+    :param r_vec: The randomness of each ciphertext.
+    :return: The component forms of each coordinate, one per vector.
+    """
+    return [
+        [_encrypt_component(mpk, tables, i, y, r) for y, r in zip(column, r_vec)] for i, column in zip(indices, columns)
+    ]
+
+
+# The public key, the fixed-base tables of its bases and the decoder of a worker process, set once by the initializer.
+_worker_mpk: Optional[PK] = None
+_worker_tables: Dict[int, FixedBaseTable] = {}
+_worker_decoder: Optional[BSGSDecoder] = None
+
+
+def _init_worker(
+        mpk: PK, tables: Optional[Dict[int, FixedBaseTable]] = None, decoder: Optional[BSGSDecoder] = None
+):
+    """Store the public key, the fixed-base tables of its bases and the decoder in a worker process."""
+    global _worker_mpk, _worker_tables, _worker_decoder
+    _worker_mpk = mpk
+    _worker_tables = tables or {}
+    _worker_decoder = decoder
+
+
+def _encrypt_columns_worker(indices: List[int], columns: List[List[int]], r_vec: List[int]) -> List[List[Form]]:
+    """Compute the ciphertext components of some coordinates in a worker process."""
+    return _encrypt_columns(_worker_mpk, _worker_tables, indices, columns, r_vec)
+
+
+def encrypt_batch(
+        mpk: PK, y_mat: List[List[int]], max_workers: int = 1, rng: Randomness = random
+) -> CiphertextBatch:
+    """
+    Encrypt many vectors under the public key.
+
+    Each vector is encrypted with its own randomness r, the work shared across vectors is the fixed-base tables of the
+    public key and the cached plaintext forms of repeated values. The tables are the ones of `PK.precompute` if it was
+    called, otherwise they are built for the number of vectors of this batch and dropped afterwards. The coordinates
+    are split across worker processes.
+
+    :param mpk: The public key.
+    :param y_mat: The plaintext input vectors to encrypt, all of the same length.
+    :param max_workers: The number of worker processes, 1 computes everything in this process.
+    :param rng: The source of randomness of the r values, which are sampled in one batch.
+    :return: The ciphertexts of all vectors in a compact batch.
+    """
+    # A table pays off from about two exponentiations of its base, i.e. from two vectors.
+    tables = mpk.tables or (tables_gen(mpk, uses=len(y_mat)) if len(y_mat) > 1 else {})
+
+    # Sample a random r for each vector and compute each c_0.
+    r_vec = sample_batch(rng, len(y_mat), 0, mpk.r_bound + 1)
+    c_0 = [_base_pow(mpk, tables, 0, r) for r in r_vec]
+
+    # Compute the other components column by column.
+    length = len(y_mat[0]) if y_mat else 0
+    columns = [[y_vec[i] for y_vec in y_mat] for i in range(length)]
+
+    if max_workers == 1:
+        components = _encrypt_columns(mpk, tables, list(range(length)), columns, r_vec)
+    else:
+        # Split the coordinates into contiguous chunks, one per worker.
+        size = max(1, ceil(length / max_workers))
+        chunks = [list(range(start, min(start + size, length))) for start in range(0, length, size)]
+        with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(mpk, tables)
+        ) as executor:
+            futures = [
+                executor.submit(_encrypt_columns_worker, chunk, [columns[i] for i in chunk], r_vec) for chunk in chunks
+            ]
+            components = [column for future in futures for column in future.result()]
+
+    # Store the ciphertexts one after the other.
+    forms = FormArray(mpk.delta_q)
+    for k in range(len(y_mat)):
+        forms.extend([c_0[k]] + [column[k] for column in components])
+    return CiphertextBatch(forms=forms, width=length + 1)
+
+
 def keygen(msk: List[int], x_vec: List[int]):
     """
     Generate a secret key corresponding to vector x and master secret key.
@@ -116,7 +423,7 @@ def keygen(msk: List[int], x_vec: List[int]):
     return r
 
 
-def decrypt(mpk: PK, sk: int, ct: List[BinaryQF], x_vec: List[int]):
+def decrypt(mpk: PK, sk: int, ct: List[BinaryQF], x_vec: List[int], decoder: Optional[BSGSDecoder] = None):
     """
     Decrypt a ciphertext using the secret key and the function vector x.
 
@@ -124,12 +431,115 @@ def decrypt(mpk: PK, sk: int, ct: List[BinaryQF], x_vec: List[int]):
     :param sk: The functional secret key (inner product of msk and x).
     :param ct: Ciphertext as a list of BinaryQF elements [c_0, c_1, ..., c_n].
     :param x_vec: Function vector x corresponding to the key.
-    :return: Decrypted inner product y·x as an integer.
+    :param decoder: An optional decoder searching the inner product in a bounded range, by default the inner product
+        is recovered modulo p by the discrete logarithm in the subgroup generated by f.
+    :return: Decrypted inner product y·x as an integer, or None if the decoder does not find it in its range.
     """
-    c_x = binary_qf_inverse(binary_qf_pow(ct[0], sk))
-
-    for i, c in enumerate(ct[1:]):
-        # Reduce c_x after each multiplication.
-        c_x = (c_x * binary_qf_pow(c, x_vec[i])).reduced_form()
+    # Compute c_0^(-sk) * prod c_i^(x_i) in one multi-exponentiation.
+    c_x = binary_qf_multi_pow(ct, [-sk] + list(x_vec))
 
+    if decoder is not None:
+        return decoder.decode(c_x)
     return discrete_log_f(mpk.p, mpk.delta_q, c_x)
+
+
+@dataclass
+class DecryptionResult:
+    """The decrypted inner product of one key, with the index of the key and the time spent on it in seconds."""
+    index: int
+    value: Optional[int]
+    seconds: float
+
+
+def _decrypt_group(
+        p: int, delta_q: int, ct: List[Form], keys: List[Tuple[int, int, Sequence[int]]],
+        decoder: Optional[BSGSDecoder] = None
+) -> List[DecryptionResult]:
+    """
+    Decrypt one ciphertext under many keys, sharing the work across keys.
+
+    With more than one key, c_0 gets a fixed-base table for the secret keys and the powers c_i^x are cached per (i, x),
+    so repeated values of x across keys cost one composition.
+
+    :param p: The prime p of the public key.
+    :param delta_q: The discriminant of the public key.
+    :param ct: The ciphertext as reduced forms on plain integers.
+    :param keys: The index, the secret key and the function vector of each key.
+    :param decoder: An optional decoder searching the inner products in a bounded range, as in decrypt.
+    :return: The result of each key.
+    """
+    bound = partial_bound(delta_q)
+    cache: Dict[Tuple[int, int], Form] = {}
+    table = None
+    if len(keys) > 1:
+        bits = max(abs(sk) for _, sk, _ in keys).bit_length()
+        table = FixedBaseTable(form_to_binary_qf(ct[0]), bits=bits, uses=len(keys))
+
+    results = []
+    for index, sk, x_vec in keys:
+        begin = time.perf_counter()
+
+        if table is None:
+            # A single key has nothing to share, so use the multi-exponentiation of decrypt.
+            c_x = binary_qf_multi_pow([form_to_binary_qf(c) for c in ct], [-sk] + list(x_vec))
+        else:
+            # Compute c_0^(-sk) * prod c_i^(x_i), where each power is cached.
+            c_x = table.pow_form(-sk)
+            for i, x in enumerate(x_vec):
+                if x != 0:
+                    if (i, x) not in cache:
+                        cache[(i, x)] = form_pow(ct[i + 1], x)
+                    c_x = compose(c_x, cache[(i, x)], bound)
+            c_x = form_to_binary_qf(c_x)
+
+        value = decoder.decode(c_x) if decoder is not None else discrete_log_f(p, delta_q, c_x)
+        results.append(DecryptionResult(index=index, value=value, seconds=time.perf_counter() - begin))
+
+    return results
+
+
+def _decrypt_group_worker(ct: List[Form], keys: List[Tuple[int, int, Sequence[int]]]) -> List[DecryptionResult]:
+    """Decrypt one ciphertext under many keys in a worker process."""
+    return _decrypt_group(_worker_mpk.p, _worker_mpk.delta_q, ct, keys, _worker_decoder)
+
+
+def decrypt_many(
+        mpk: PK, cts: List[List[BinaryQF]], keys: List[Tuple[int, int, Sequence[int]]], max_workers: int = 1,
+        decoder: Optional[BSGSDecoder] = None
+) -> List[DecryptionResult]:
+    """
+    Decrypt many (ciphertext, key) pairs, sharing the work of keys on the same ciphertext.
+
+    The keys of one ciphertext are decrypted together, reusing the powers c_i^x of repeated values of x and a
+    fixed-base table of c_0. Different ciphertexts are spread across worker processes, and each worker gets its own
+    copy of the decoder once, when it starts.
+
+    :param mpk: Public key parameters used in the scheme.
+    :param cts: The ciphertexts, each as a list of BinaryQF elements [c_0, c_1, ..., c_n].
+    :param keys: For each key, the index of its ciphertext in cts, the functional secret key and the function vector.
+    :param max_workers: The number of worker processes, 1 computes everything in this process.
+    :param decoder: An optional decoder searching the inner products in a bounded range, by default they are
+        recovered modulo p by the discrete logarithm in the subgroup generated by f.
+    :return: The result of each key, in the order of the keys, whose value is None if the decoder does not find it.
+    """
+    # Group the keys by ciphertext.
+    groups: Dict[int, List[Tuple[int, int, Sequence[int]]]] = {}
+    for index, (ct_index, sk, x_vec) in enumerate(keys):
+        groups.setdefault(ct_index, []).append((index, int(sk), [int(x) for x in x_vec]))
+    forms = {ct_index: [binary_qf_to_form(c) for c in cts[ct_index]] for ct_index in groups}
+
+    if max_workers == 1:
+        results = [
+            result for ct_index, group in groups.items()
+            for result in _decrypt_group(mpk.p, mpk.delta_q, forms[ct_index], group, decoder)
+        ]
+    else:
+        with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=_init_worker, initargs=(mpk, None, decoder)
+        ) as executor:
+            futures = [
+                executor.submit(_decrypt_group_worker, forms[ct_index], group) for ct_index, group in groups.items()
+            ]
+            results = [result for future in futures for result in future.result()]
+
+    return sorted(results, key=lambda result: result.index)
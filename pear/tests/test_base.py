@@ -0,0 +1,294 @@
+import io
+import json
+import random
+
+import pytest
+from sage.arith.misc import random_prime
+from sage.rings.finite_rings.all import GF
+
+from src.flpcp import BinaryValidation, NormBoundValidation, RangeValidation
+from src.flpcp.base import XofRandom, parallel_sum_chunk_length, sample_batch, seed_gen
+from src.flpcp.serialization import element_size, unpack_elements
+
+
+class TestFLPCP:
+    def test_lagrange_basis(self):
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Initialize some FLPCP and get the field.
+        flpcp = BinaryValidation(input_size=input_size, field_size=field_size)
+        field = GF(field_size)
+
+        # Evaluate the basis at a random point and at a point of the domain.
+        for r in [field.random_element(), field(3)]:
+            basis = flpcp._query_lagrange_basis_gen(int(r), input_size)
+
+            # Compare with the definition of the Lagrange basis.
+            for j in range(input_size + 1):
+                expected = field(1)
+                for m in range(input_size + 1):
+                    if m != j:
+                        expected *= (r - m) / (j - m)
+                assert basis[j] == expected
+
+    def test_verify_batch(self):
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Initialize the prover and generate proofs.
+        prover = BinaryValidation(input_size=input_size, field_size=field_size)
+        proof_1 = prover.proof_gen(message=[1, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+        proof_2 = prover.proof_gen(message=[11, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+        proof_3 = prover.proof_gen(message=[0, 0, 0, 0, 0, 1, 1, 1, 1, 1])
+
+        # Initialize the verifier and generate the query for verification.
+        verifier = BinaryValidation(input_size=input_size, field_size=field_size)
+        query = verifier.query_gen()
+
+        # The batch verification should agree with verifying one by one.
+        assert verifier.verify_batch(proofs=[proof_1, proof_2, proof_3], query=query) == [True, False, True]
+        assert verifier.verify_batch(proofs=[proof_1, proof_3], query=query) == [True, True]
+
+        # Tamper with each entry of a valid proof, in the message, the constants and the proof polynomial.
+        tampered = []
+        for i in range(len(proof_1)):
+            entries = prover.backend.to_list(proof_1)
+            entries[i] = (entries[i] + 1) % field_size
+            tampered.append(prover.backend.vector(entries))
+
+        # The batch decisions should be those of verifying the proofs one by one, among valid proofs.
+        proofs = [proof_1] + tampered + [proof_3]
+        expected = [verifier.verify(proof=proof, query=query) for proof in proofs]
+        assert verifier.verify_batch(proofs=proofs, query=query) == expected
+        assert expected[0] and expected[-1] and not any(expected[1:-1])
+
+    def test_numpy_backend(self):
+        # The numpy backend is optional, so skip this test without numpy.
+        pytest.importorskip("numpy")
+
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Initialize the prover and the verifier with the numpy backend.
+        prover = BinaryValidation(input_size=input_size, field_size=field_size, backend="numpy")
+        verifier = BinaryValidation(input_size=input_size, field_size=field_size, backend="numpy")
+
+        # Generate proofs and the query for verification.
+        proof_1 = prover.proof_gen(message=[1, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+        proof_2 = prover.proof_gen(message=[11, 0, 1, 0, 1, 0, 1, 0, 1, 0])
+        query = verifier.query_gen()
+
+        # The verification should behave the same as with sage.
+        assert verifier.verify(proof=proof_1, query=query) is True
+        assert verifier.verify(proof=proof_2, query=query) is False
+        assert verifier.verify_batch(proofs=[proof_1, proof_2], query=query) == [True, False]
+
+    def test_template_persistence(self, tmp_path):
+        # Sample a field size for this test.
+        input_size = 5
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        template_path = str(tmp_path / "template.json")
+
+        # The first verifier builds the template and saves it.
+        verifier = NormBoundValidation(
+            input_size=input_size, field_size=field_size, norm_bound=10, input_bound=3, template_path=template_path
+        )
+        assert (tmp_path / "template.json").exists()
+
+        # The second verifier loads the same template.
+        verifier = NormBoundValidation(
+            input_size=input_size, field_size=field_size, norm_bound=10, input_bound=3, template_path=template_path
+        )
+
+        # Generate proofs and the query for verification.
+        prover = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=3)
+        query = verifier.query_gen()
+
+        # The verification should work with the loaded template.
+        assert verifier.verify(proof=prover.proof_gen(message=[1, 2, 1, 2, 1]), query=query) is True
+        assert verifier.verify(proof=prover.proof_gen(message=[1, 2, 1, 2, 9]), query=query) is False
+
+        # A template of a different configuration should be rejected.
+        with pytest.raises(ValueError):
+            NormBoundValidation(
+                input_size=input_size, field_size=field_size, norm_bound=6, input_bound=4, template_path=template_path
+            )
+
+        # A template with a corrupted entry in any of its tables should be rejected.
+        with open(template_path) as file:
+            data = json.load(file)
+        corruptions = [("factorial_inverses", 3), ("gate_tree", 0), ("gate_tree", -1), ("gate_denominator_inverse", 5)]
+        for table, index in corruptions:
+            corrupted = json.loads(json.dumps(data))
+            if table == "gate_tree":
+                corrupted[table][index][0][1] += 1
+            else:
+                corrupted[table][index] += 1
+            with open(template_path, "w") as file:
+                json.dump(corrupted, file)
+            with pytest.raises(ValueError):
+                NormBoundValidation(
+                    input_size=input_size, field_size=field_size, norm_bound=10, input_bound=3,
+                    template_path=template_path
+                )
+
+    def test_proof_gen_stream(self):
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        message = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+
+        # Initialize the prover and the verifier.
+        prover = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=5)
+        verifier = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=5)
+
+        # Generate the proof as a whole and as a stream from a generator with the same randomness.
+        random.seed(0)
+        proof = prover.proof_gen(message=message)
+        random.seed(0)
+        output = io.BytesIO()
+        prover.proof_gen_stream(message=(x for x in message), output=output, chunk_size=7)
+
+        # The streamed proof should have the same entries and pass the verification.
+        streamed = unpack_elements(output.getvalue(), element_size(field_size))
+        assert streamed == [int(x) for x in proof]
+        assert verifier.verify(proof=prover.backend.vector(streamed), query=verifier.query_gen()) is True
+
+    def test_verify_compact(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Use each validator with one valid and one invalid message.
+        cases = [
+            (BinaryValidation(input_size=5, field_size=field_size), [1, 0, 1, 0, 1], [1, 0, 2, 0, 1]),
+            (RangeValidation(input_size=3, field_size=field_size, lower=1, upper=4), [1, 2, 4], [0, 2, 4]),
+            (
+                NormBoundValidation(input_size=3, field_size=field_size, norm_bound=4, input_bound=3),
+                [1, 2, 3], [5, 2, 3]
+            ),
+        ]
+
+        for validator, valid, invalid in cases:
+            for low_memory in [False, True]:
+                # Sample the dense and the compact query with the same randomness.
+                random.seed(low_memory)
+                query = validator.query_gen()
+                random.seed(low_memory)
+                compact = validator.query_gen_compact(low_memory=low_memory)
+
+                # The values at r should equal the dot products with the dense query, also for an arbitrary vector.
+                f_list, p, c = query
+                vector = [random.randrange(field_size) for _ in range(validator.total_size)]
+                expected = [validator.backend.dot(f, validator.backend.vector(vector)) for f in f_list + [p, c]]
+                a_list, p_value, c_value = validator._compact_evaluate(vector, compact)
+                assert a_list + [p_value, c_value] == expected
+
+                # The decisions should agree with the dense verification.
+                assert validator.verify_compact(proof=validator.proof_gen(message=valid), query=compact) is True
+                assert validator.verify_compact(proof=validator.proof_gen(message=invalid), query=compact) is False
+
+    def test_seeded_query(self):
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Initialize the prover and two verifiers, which only share a seed.
+        prover = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=5)
+        verifier_1 = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=5)
+        verifier_2 = NormBoundValidation(input_size=input_size, field_size=field_size, norm_bound=10, input_bound=5)
+        seed = seed_gen()
+
+        # Both verifiers should expand the same query, and the expansion should be cached.
+        query = verifier_1.query_gen(seed=seed)
+        assert verifier_2.query_gen(seed=seed) == query
+        assert verifier_1.query_gen(seed=seed) is query
+        assert verifier_1.query_gen(seed=seed_gen()) != query
+        assert verifier_1.query_gen_compact(seed=seed) == verifier_2.query_gen_compact(seed=seed)
+
+        # The seeded queries should verify as usual.
+        proof = prover.proof_gen(message=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+        assert verifier_1.verify(proof=proof, query=query) is True
+        assert verifier_2.verify_compact(proof=proof, query=verifier_2.query_gen_compact(seed=seed)) is True
+        assert verifier_1.verify(proof=prover.proof_gen(message=[1, 2, 3, 4, 5, 6, 7, 8, 9, 40]), query=query) is False
+
+        # The samples of a stream should be in range and only depend on the seed.
+        samples = [XofRandom(seed).randrange(3, 1000) for _ in range(2)]
+        assert samples[0] == samples[1] and 3 <= samples[0] < 1000
+
+    def test_sample_batch(self):
+        # Sample a field size for this test.
+        input_size = 10
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # A batch from a stream should be in range and only depend on the seed.
+        seed = seed_gen()
+        batch = sample_batch(XofRandom(seed), 1000, 5, 300)
+        assert batch == sample_batch(XofRandom(seed), 1000, 5, 300)
+        assert min(batch) >= 5 and max(batch) < 300 and len(set(batch)) > 250
+
+        # The global generator should draw the same values as separate calls.
+        random.seed(0)
+        expected = [random.randrange(5, 300) for _ in range(10)]
+        random.seed(0)
+        assert sample_batch(random, 10, 5, 300) == expected
+
+        # Validators should prove and verify with the randomness of a stream.
+        prover = BinaryValidation(input_size=input_size, field_size=field_size, rng=XofRandom(seed_gen()))
+        verifier = BinaryValidation(input_size=input_size, field_size=field_size, rng=XofRandom(seed_gen()))
+        query = verifier.query_gen()
+        assert verifier.verify(proof=prover.proof_gen(message=[1, 0, 1, 0, 1, 0, 1, 0, 1, 0]), query=query) is True
+        assert verifier.verify(proof=prover.proof_gen(message=[1, 0, 1, 0, 1, 0, 1, 0, 1, 2]), query=query) is False
+
+    def test_parallel_sum(self, tmp_path):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Use each validator with one valid and one invalid message, for a few chunk lengths.
+        cases = [
+            (BinaryValidation, {"input_size": 10}, [1, 0, 1, 1, 0, 0, 1, 0, 1, 1], [1, 0, 1, 1, 0, 0, 1, 0, 1, 2]),
+            (RangeValidation, {"input_size": 7, "lower": 1, "upper": 4}, [1, 2, 3, 4, 1, 2, 3], [1, 2, 3, 4, 1, 2, 5]),
+            (
+                NormBoundValidation, {"input_size": 5, "norm_bound": 6, "input_bound": 3},
+                [1, 2, 3, 4, 5], [7, 7, 7, 1, 1]
+            ),
+        ]
+
+        for validator_class, params, valid, invalid in cases:
+            plain = validator_class(field_size=field_size, **params)
+            for chunk_length in [1, 3, parallel_sum_chunk_length(plain._num_gate, plain._degree)]:
+                validator = validator_class(field_size=field_size, chunk_length=chunk_length, **params)
+
+                # The proofs should be accepted or rejected as without the gadget, also with a low memory query.
+                for low_memory in [False, True]:
+                    query = validator.query_gen_compact(low_memory=low_memory)
+                    assert validator.verify_compact(proof=validator.proof_gen(message=valid), query=query) is True
+                    assert validator.verify_compact(proof=validator.proof_gen(message=invalid), query=query) is False
+
+                # The dense queries cannot express the weights of the gadget.
+                with pytest.raises(ValueError):
+                    validator.query_gen()
+
+            # The best chunk length should give a shorter proof.
+            assert validator.total_size < plain.total_size
+
+        # A chunk length above the largest check is clamped, so it adds no padding constants to the proof.
+        params = cases[0][1]
+        validator = BinaryValidation(field_size=field_size, chunk_length=100, **params)
+        assert validator.chunk_length == 10
+        assert validator.total_size == BinaryValidation(field_size=field_size, chunk_length=10, **params).total_size
+        query = validator.query_gen_compact()
+        assert validator.verify_compact(proof=validator.proof_gen(message=cases[0][2]), query=query) is True
+
+        # The template should keep the layout of the gadget.
+        params = {"field_size": field_size, "template_path": str(tmp_path / "template.json"), **cases[2][1]}
+        prover = NormBoundValidation(chunk_length=4, **params)
+        verifier = NormBoundValidation(chunk_length=4, **params)
+        assert verifier._template == prover._template
+        query = verifier.query_gen_compact()
+        assert verifier.verify_compact(proof=prover.proof_gen(message=[1, 2, 3, 4, 5]), query=query) is True
+        with pytest.raises(ValueError):
+            NormBoundValidation(chunk_length=3, **params)
@@ -0,0 +1,31 @@
+from sage.arith.misc import random_prime
+
+from src.client import ClientBundle, ClientPipeline
+from src.flpcp import NormBoundValidation
+from src.ipfe.ipfe import decrypt, keygen, param_gen
+
+
+class TestClientPipeline:
+    def test_submit(self):
+        # Sample a field size and the encryption keys for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+        validator = NormBoundValidation(input_size=3, field_size=field_size, norm_bound=4, input_bound=3)
+
+        for use_processes in [False, True]:
+            with ClientPipeline(validator=validator, mpk=mpk, use_processes=use_processes) as pipeline:
+                bundles = [pipeline.submit(message=[1, 2, 3]), pipeline.submit(message=[3, 0, 2])]
+
+            # The proofs should be accepted and use independent randomness.
+            query = validator.query_gen()
+            assert all(validator.verify(proof=bundle.proof, query=query) for bundle in bundles)
+            assert bundles[0].ciphertext[0] != bundles[1].ciphertext[0]
+
+            # The ciphertexts should decrypt to the inner products.
+            x_vec = [1, 2, 3]
+            sk = keygen(msk=msk, x_vec=x_vec)
+            assert [decrypt(mpk=mpk, sk=sk, ct=bundle.ciphertext, x_vec=x_vec) for bundle in bundles] == [14, 9]
+
+            # The bundle should be the same after serialization.
+            loaded = ClientBundle.from_bytes(bundles[0].to_bytes(field_size), validator.backend)
+            assert list(loaded.proof) == list(bundles[0].proof) and loaded.ciphertext == bundles[0].ciphertext
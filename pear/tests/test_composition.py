@@ -0,0 +1,36 @@
+from src.ipfe.composition import compose, discriminant, inverse, nucomp, nudupl, partial_bound, reduce
+from src.ipfe.helper import expo_f
+from src.ipfe.ipfe import param_gen
+
+
+class TestComposition:
+    def test_compose(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+        bound = partial_bound(mpk.delta_q)
+
+        # Use reduced forms and the forms encoding messages, which are not reduced.
+        forms = [mpk.gp] + mpk.vec_h + [expo_f(mpk.p, mpk.delta_q, k) for k in [0, 1, 97]]
+
+        # Compare with the composition and reduction in sage.
+        for f in forms:
+            for g in forms:
+                expected = (f * g).reduced_form()
+                result = nucomp((int(f[0]), int(f[1]), int(f[2])), (int(g[0]), int(g[1]), int(g[2])), bound)
+                assert result == tuple(int(x) for x in expected)
+                assert discriminant(result) == mpk.delta_q
+
+    def test_nudupl(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=1)
+        bound = partial_bound(mpk.delta_q)
+
+        # Square repeatedly and compare with sage.
+        form, expected = reduce((int(mpk.gp[0]), int(mpk.gp[1]), int(mpk.gp[2]))), mpk.gp
+        for _ in range(20):
+            form, expected = nudupl(form, bound), (expected * expected).reduced_form()
+            assert form == tuple(int(x) for x in expected)
+            assert compose(form, form, bound) == nudupl(form, bound)
+
+        # A form composed with its inverse gives the principal form.
+        assert compose(form, inverse(form), bound) == (1, 1, (1 - mpk.delta_q) // 4)
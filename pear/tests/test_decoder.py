@@ -0,0 +1,67 @@
+import pickle
+
+from src.ipfe.decoder import BSGSDecoder
+from src.ipfe.helper import binary_qf_inverse, binary_qf_pow, expo_f
+from src.ipfe.ipfe import param_gen, encrypt, keygen, decrypt, decrypt_many
+
+
+class TestDecoder:
+    def test_decode(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=1)
+
+        # Decode powers of gp in a range containing negative values.
+        decoder = BSGSDecoder(base=mpk.gp, lower=-1000, upper=5000)
+        assert decoder.table_size <= 40
+        for m in [-1000, -1, 1, 97, 2500, 4999]:
+            form = binary_qf_pow(mpk.gp, m) if m > 0 else binary_qf_inverse(binary_qf_pow(mpk.gp, -m))
+            assert decoder.decode(form) == m
+
+        # Values outside of the range are not found.
+        assert decoder.decode(binary_qf_pow(mpk.gp, 5000)) is None
+
+        # More expected decodings build a larger table, up to the maximum size.
+        assert BSGSDecoder(base=mpk.gp, lower=-1000, upper=5000, uses=100).table_size == 389
+        assert BSGSDecoder(base=mpk.gp, lower=-1000, upper=5000, max_table_size=100, uses=100).table_size == 101
+
+        # A smaller table only takes more giant steps.
+        decoder = BSGSDecoder(base=mpk.gp, lower=0, upper=5000, max_table_size=8)
+        assert decoder.table_size == 9 and decoder.decode(binary_qf_pow(mpk.gp, 4321)) == 4321
+
+    def test_decrypt(self):
+        # Get the parameters.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+        decoder = BSGSDecoder(base=expo_f(mpk.p, mpk.delta_q, 1), lower=-100, upper=100)
+
+        # The decoder recovers negative inner products, and is reused across decryptions.
+        ct = encrypt(mpk=mpk, y_vec=[1, 2, 3])
+        for x_vec in [[1, 1, 1], [0, -2, -1], [3, 0, 0]]:
+            sk = keygen(msk=msk, x_vec=x_vec)
+            result = decrypt(mpk=mpk, sk=sk, ct=ct, x_vec=x_vec, decoder=decoder)
+            assert result == sum(x * y for x, y in zip(x_vec, [1, 2, 3]))
+
+    def test_decrypt_many(self):
+        # Get the parameters.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+        decoder = BSGSDecoder(base=expo_f(mpk.p, mpk.delta_q, 1), lower=-100, upper=100, uses=8)
+
+        # A pickled decoder is rebuilt from its parameters.
+        copy = pickle.loads(pickle.dumps(decoder))
+        assert copy.table_size == decoder.table_size and copy.decode(expo_f(mpk.p, mpk.delta_q, 42)) == 42
+
+        # Encrypt two vectors and derive keys, some with negative inner products.
+        y_mat = [[1, 2, 3], [4, 0, 6]]
+        cts = [encrypt(mpk=mpk, y_vec=y_vec) for y_vec in y_mat]
+        x_mat = [[1, 1, 1], [0, -2, -1], [-20, 0, 0]]
+        keys = [(k, keygen(msk=msk, x_vec=x_vec), x_vec) for k in [0, 1] for x_vec in x_mat]
+
+        # The decoder recovers the signed inner products, in this process and in worker processes.
+        for max_workers in [1, 2]:
+            results = decrypt_many(mpk=mpk, cts=cts, keys=keys, max_workers=max_workers, decoder=decoder)
+            assert [result.value for result in results] == [
+                sum(x * y for x, y in zip(x_vec, y_mat[k])) for k, _, x_vec in keys
+            ]
+
+        # Inner products outside of the range of the decoder are not found.
+        keys = [(1, keygen(msk=msk, x_vec=[30, 0, 0]), [30, 0, 0])]
+        assert decrypt_many(mpk=mpk, cts=cts, keys=keys, decoder=decoder)[0].value is None
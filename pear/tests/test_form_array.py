@@ -0,0 +1,43 @@
+import pytest
+
+from src.ipfe.form_array import FormArray
+from src.ipfe.helper import binary_qf_inverse, binary_qf_pow, expo_f
+from src.ipfe.ipfe import param_gen
+
+
+class TestFormArray:
+    def test_form_array(self):
+        # Get the parameters, and use the forms of the public key and some non-reduced plaintext forms.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+        forms = mpk.vec_h + [expo_f(mpk.p, mpk.delta_q, k) for k in [0, 1, 97]]
+        array = FormArray(mpk.delta_q, forms)
+
+        # The forms are stored reduced, as two coefficients of about half the size of the discriminant.
+        assert len(array) == 6
+        assert array.to_binary_qfs() == [f.reduced_form() for f in forms]
+        assert array[-1] == array[5] and 8 * array.nbytes <= len(array) * (int(mpk.delta_q).bit_length() + 16)
+        with pytest.raises(IndexError):
+            _ = array[6]
+
+        # The elementwise operations should agree with sage.
+        other = FormArray(mpk.delta_q, list(reversed(forms)))
+        assert array.compose(other).to_binary_qfs() == [(f * g).reduced_form() for f, g in zip(forms, reversed(forms))]
+        assert array.square().to_binary_qfs() == [(f * f).reduced_form() for f in forms]
+        assert array.inverse().to_binary_qfs() == [binary_qf_inverse(f) for f in forms]
+        assert array.pow(5).to_binary_qfs() == [binary_qf_pow(f, 5) for f in forms]
+
+        # The array should be the same after serialization.
+        assert FormArray.from_bytes(array.to_bytes()) == array
+
+        # Forms of another discriminant should be rejected.
+        with pytest.raises(ValueError):
+            array.append((1, 1, 1))
+
+        # Bytes with a zero coefficient a, or with a form that is not reduced, should be rejected.
+        width = array.nbytes // (2 * len(array))
+        offset = len(array.to_bytes()) - array.nbytes
+        for a in [0, 1]:
+            data = bytearray(array.to_bytes())
+            data[offset:offset + width] = a.to_bytes(width, "little")
+            with pytest.raises(ValueError):
+                FormArray.from_bytes(bytes(data))
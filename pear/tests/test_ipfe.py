@@ -1,5 +1,14 @@
-from src.ipfe.helper import expo_f, discrete_log_f
-from src.ipfe.ipfe import param_gen, encrypt, keygen, decrypt
+import os
+import random
+
+from src.flpcp.base import XofRandom, seed_gen
+from src.ipfe.helper import (
+    FixedBaseTable, expo_f, discrete_log_f, binary_qf_inverse, binary_qf_multi_pow, binary_qf_pow
+)
+from src.ipfe.ipfe import (
+    CiphertextBatch, param_gen, param_gen_cached, encrypt, encrypt_batch, keygen, decrypt, decrypt_many, extend_keys,
+    load_keys, save_keys
+)
 
 
 class TestIPFE:
@@ -25,3 +34,131 @@ class TestIPFE:
         r = decrypt(mpk=mpk, sk=sk, ct=ct, x_vec=[5, 4, 3, 2, 1])
 
         assert r == 35
+
+    def test_ipfe_stream_randomness(self):
+        # Get the parameters and encrypt with the randomness of a stream.
+        rng = XofRandom(seed_gen())
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3, rng=rng)
+        ct = encrypt(mpk=mpk, y_vec=[1, 2, 3], rng=rng)
+        batch = encrypt_batch(mpk=mpk, y_mat=[[1, 2, 3], [3, 2, 1]], rng=rng)
+
+        # Decrypt the inner products.
+        sk = keygen(msk=msk, x_vec=[1, 1, 2])
+        assert decrypt(mpk=mpk, sk=sk, ct=ct, x_vec=[1, 1, 2]) == 9
+        assert [decrypt(mpk=mpk, sk=sk, ct=batch[i], x_vec=[1, 1, 2]) for i in range(2)] == [9, 7]
+
+    def test_binary_qf_pow(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=1)
+
+        # Compare with repeated composition.
+        expected = mpk.gp
+        for n in range(1, 40):
+            assert binary_qf_pow(mpk.gp, n) == expected
+            expected = (expected * mpk.gp).reduced_form()
+
+    def test_binary_qf_multi_pow(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=5)
+
+        # Use few and many forms, so both methods are covered, with zero, negative and much longer exponents.
+        for size in [5, 50]:
+            forms = [mpk.vec_h[i % 5] for i in range(size)]
+            exponents = [0, -3, 2 ** 80 + 1] + [random.randint(1, 1000) for _ in range(size - 3)]
+
+            # Compare with exponentiating each form separately.
+            expected = binary_qf_inverse(binary_qf_pow(forms[1], 3))
+            for f, e in zip(forms[2:], exponents[2:]):
+                expected = (expected * binary_qf_pow(f, e)).reduced_form()
+            assert binary_qf_multi_pow(forms, exponents) == expected
+
+    def test_fixed_base_table(self):
+        # Get the parameters.
+        _, mpk = param_gen(lambda_bits=40, mu_bits=36, length=1)
+
+        # Compare with the exponentiation, including exponents longer than the table.
+        table = FixedBaseTable(mpk.gp, bits=20)
+        for n in [1, 2, 1000, 2 ** 20 - 1, 2 ** 30 + 5]:
+            assert table.pow(n) == binary_qf_pow(mpk.gp, n)
+        assert table.pow(-7) == binary_qf_inverse(binary_qf_pow(mpk.gp, 7))
+
+        # A single encryption does not build any table.
+        encrypt(mpk=mpk, y_vec=[1])
+        assert mpk.tables == {}
+
+        # The precomputed tables of the public key are reused by later encryptions, until they are freed.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=2)
+        mpk.precompute(uses=4)
+        tables = dict(mpk.tables)
+        ct = encrypt(mpk=mpk, y_vec=[2, 3])
+        assert mpk.tables == tables and len(tables) == 3
+        assert decrypt(mpk=mpk, sk=keygen(msk=msk, x_vec=[1, 1]), ct=ct, x_vec=[1, 1]) == 5
+        mpk.clear_tables()
+        assert mpk.tables == {}
+
+    def test_encrypt_batch(self):
+        # Get the parameters.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=4)
+        x_vec = [5, 4, 3, 2]
+        sk = keygen(msk=msk, x_vec=x_vec)
+
+        # Encrypt vectors with repeated small values, in this process and with worker processes.
+        y_mat = [[1, 0, 1, 2], [0, 0, 3, 1], [1, 1, 1, 1]]
+        for max_workers in [1, 2]:
+            batch = encrypt_batch(mpk=mpk, y_mat=y_mat, max_workers=max_workers)
+            assert len(batch) == 3
+            assert CiphertextBatch.from_bytes(batch.to_bytes()) == batch
+
+            # Each ciphertext should decrypt to its inner product.
+            for k, y_vec in enumerate(y_mat):
+                assert decrypt(mpk=mpk, sk=sk, ct=batch[k], x_vec=x_vec) == sum(x * y for x, y in zip(x_vec, y_vec))
+
+    def test_decrypt_many(self):
+        # Get the parameters.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=3)
+
+        # Encrypt two vectors and derive keys for function vectors with repeated values.
+        y_mat = [[1, 2, 3], [4, 0, 6]]
+        cts = [encrypt(mpk=mpk, y_vec=y_vec) for y_vec in y_mat]
+        x_mat = [[1, 1, 1], [1, 2, 1], [0, 2, -1]]
+        keys = [(k, keygen(msk=msk, x_vec=x_vec), x_vec) for k in [0, 1] for x_vec in x_mat] + [(1, 0, [0, 0, 0])]
+
+        # Each result should be the inner product, in the order of the keys.
+        for max_workers in [1, 2]:
+            results = decrypt_many(mpk=mpk, cts=cts, keys=keys, max_workers=max_workers)
+            assert [result.index for result in results] == list(range(len(keys)))
+            assert [result.value for result in results] == [
+                sum(x * y for x, y in zip(x_vec, y_mat[k])) % mpk.p for k, _, x_vec in keys
+            ]
+            assert all(result.seconds >= 0 for result in results)
+
+    def test_keys_persistence(self, tmp_path):
+        # Get the parameters and save them.
+        msk, mpk = param_gen(lambda_bits=40, mu_bits=36, length=2)
+        save_keys(str(tmp_path / "keys.json"), msk, mpk)
+
+        # The file contains the master secret key, so only its owner may read it.
+        assert os.stat(tmp_path / "keys.json").st_mode & 0o777 == 0o600
+
+        # The loaded keys should be the same.
+        loaded_msk, loaded_mpk = load_keys(str(tmp_path / "keys.json"))
+        assert loaded_msk == msk and loaded_mpk == mpk
+
+        # Extend the loaded keys, which should still decrypt correctly.
+        msk, mpk = extend_keys(msk=loaded_msk, mpk=loaded_mpk, length=4)
+        assert msk[:2] == loaded_msk and len(mpk.vec_h) == 4
+        ct = encrypt(mpk=mpk, y_vec=[1, 2, 3, 4])
+        assert decrypt(mpk=mpk, sk=keygen(msk=msk, x_vec=[4, 3, 2, 1]), ct=ct, x_vec=[4, 3, 2, 1]) == 20
+
+    def test_param_gen_cached(self, tmp_path):
+        # The first call generates the keys and the second one loads them.
+        msk, mpk = param_gen_cached(lambda_bits=40, mu_bits=36, length=2, cache_dir=str(tmp_path))
+        assert param_gen_cached(lambda_bits=40, mu_bits=36, length=2, cache_dir=str(tmp_path)) == (msk, mpk)
+
+        # A longer length extends the cached keys in the same group.
+        longer_msk, longer_mpk = param_gen_cached(lambda_bits=40, mu_bits=36, length=3, cache_dir=str(tmp_path))
+        assert longer_msk[:2] == msk and longer_mpk.delta_q == mpk.delta_q and longer_mpk.vec_h[:2] == mpk.vec_h
+
+        # A shorter length truncates the cached keys in the same group.
+        shorter_msk, shorter_mpk = param_gen_cached(lambda_bits=40, mu_bits=36, length=1, cache_dir=str(tmp_path))
+        assert shorter_msk == msk[:1] and shorter_mpk.delta_q == mpk.delta_q and shorter_mpk.vec_h == mpk.vec_h[:1]
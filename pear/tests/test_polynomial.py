@@ -0,0 +1,65 @@
+from sage.arith.misc import random_prime
+from sage.rings.finite_rings.all import GF
+from sage.rings.polynomial.polynomial_ring_constructor import PolynomialRing
+
+from src.flpcp.polynomial import InterpolationDomain, _ntt_faster, interpolate, poly_mul, poly_prod
+
+
+class TestPolynomial:
+    def test_poly_mul(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        ring = PolynomialRing(GF(field_size), "x")
+
+        # Compare with the multiplication in sage, for both short and long inputs.
+        for length in [3, 100]:
+            a, b = ring.random_element(degree=length), ring.random_element(degree=length + 5)
+            c = poly_mul([int(x) for x in a.list()], [int(x) for x in b.list()], int(field_size))
+            assert ring(c) == a * b
+
+    def test_poly_mul_ntt(self):
+        # Use a 127-bit field with roots of unity of order 2^64.
+        field_size = 85070591730234621602781058781612605441
+        ring = PolynomialRing(GF(field_size), "x")
+
+        # Multiply long enough inputs to use NTT.
+        a, b = ring.random_element(degree=8000), ring.random_element(degree=8000)
+        a_list, b_list = [int(x) for x in a.list()], [int(x) for x in b.list()]
+        assert _ntt_faster(a_list, b_list, field_size)
+        assert ring(poly_mul(a_list, b_list, field_size)) == a * b
+
+        # With a 64-bit field, the Kronecker substitution is faster for these lengths.
+        field_size = 2 ** 64 - 2 ** 32 + 1
+        assert not _ntt_faster([1] * 8001, [1] * 8001, field_size)
+        assert _ntt_faster([1] * 2 ** 15, [1] * 2 ** 15, field_size)
+
+    def test_poly_prod(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        ring = PolynomialRing(GF(field_size), "x")
+
+        # Compute (x - 1) * (x - 2) * ... * (x - 5).
+        c = poly_prod([[-i % field_size, 1] for i in range(1, 6)], int(field_size))
+        assert ring(c) == ring.prod(ring.gen() - i for i in range(1, 6))
+
+    def test_interpolation(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        field = GF(field_size)
+
+        # Interpolate random values over the domain {0, ..., 20}.
+        domain = InterpolationDomain(p=int(field_size), n=20)
+        values = [int(field.random_element()) for _ in range(21)]
+        f = PolynomialRing(field, "x")(domain.interpolate(values))
+
+        # The polynomial should pass through all the values.
+        assert [f(i) for i in range(21)] == values
+
+    def test_interpolation_low_memory(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        field = GF(field_size)
+
+        # Interpolating without the cached tree should give the same polynomial.
+        values = [int(field.random_element()) for _ in range(30)]
+        assert interpolate(values, int(field_size)) == InterpolationDomain(p=int(field_size), n=29).interpolate(values)
@@ -69,3 +69,28 @@ class TestRangeValidation:
         assert verifier.verify(proof=proof_1, query=query) is True
         # The verification on this proof should fail.
         assert verifier.verify(proof=proof_2, query=query) is False
+
+    def test_range_validation_strategy(self):
+        # Sample a field size for this test.
+        input_size = 5
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # A narrow range uses the product gate and a wide range the binary digits.
+        assert RangeValidation(input_size=input_size, field_size=field_size, lower=1, upper=4).strategy == "product"
+        assert RangeValidation(input_size=input_size, field_size=field_size, lower=0, upper=100).strategy == "bits"
+
+        # Both strategies should accept and reject the same messages, including inputs below and above the range.
+        for strategy in ["product", "bits"]:
+            validator = RangeValidation(
+                input_size=input_size, field_size=field_size, lower=10, upper=40, strategy=strategy, chunk_length=3
+            )
+            query = validator.query_gen_compact()
+            assert validator.verify_compact(proof=validator.proof_gen(message=[10, 40, 25, 11, 39]), query=query)
+            assert not validator.verify_compact(proof=validator.proof_gen(message=[10, 40, 25, 9, 39]), query=query)
+            assert not validator.verify_compact(proof=validator.proof_gen(message=[10, 41, 25, 11, 39]), query=query)
+
+        # The bits strategy should also work with the dense queries.
+        validator = RangeValidation(input_size=input_size, field_size=field_size, lower=10, upper=40, strategy="bits")
+        query = validator.query_gen()
+        assert validator.verify(proof=validator.proof_gen(message=[10, 40, 25, 11, 39]), query=query) is True
+        assert validator.verify(proof=validator.proof_gen(message=[10, 40, 25, 11, 70]), query=query) is False
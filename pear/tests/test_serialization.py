@@ -0,0 +1,59 @@
+import pytest
+from sage.arith.misc import random_prime
+
+from src.flpcp import NormBoundValidation
+from src.flpcp.backend import get_backend
+from src.flpcp.serialization import (
+    QUERY, dump_proof, dump_query, element_size, load_array, load_proof, load_query, map_file
+)
+
+
+class TestSerialization:
+    @pytest.mark.parametrize("backend", ["sage", "numpy"])
+    def test_proof_and_query(self, backend):
+        # The numpy backend is only tested when numpy is installed.
+        if backend == "numpy":
+            pytest.importorskip("numpy")
+
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+        message = [1, 2, 1, 2, 1]
+
+        # Generate a proof and a query.
+        validator = NormBoundValidation(input_size=5, field_size=field_size, norm_bound=11, input_bound=2)
+        proof = validator.proof_gen(message=message)
+        query = validator.query_gen()
+
+        # The elements are packed to 16 bytes each.
+        data = dump_proof(proof, field_size)
+        assert len(data) < 20 + 16 * (len(proof) + 1)
+
+        # Load the proof and the query with the backend and verify.
+        validator = NormBoundValidation(
+            input_size=5, field_size=field_size, norm_bound=11, input_bound=2, backend=backend
+        )
+        loaded_proof = load_proof(dump_proof(proof, field_size), validator.backend)
+        loaded_query = load_query(dump_query(query, field_size), validator.backend)
+        assert validator.backend.to_list(loaded_proof) == [int(x) for x in proof]
+        assert validator.verify(proof=loaded_proof, query=loaded_query) is True
+
+        # Loading with a different field or as the wrong kind should fail.
+        with pytest.raises(ValueError):
+            load_proof(data, get_backend(backend, field_size=7))
+        with pytest.raises(ValueError):
+            load_query(data, validator.backend)
+
+    def test_mapped_array(self, tmp_path):
+        # Use a small field, so that the elements fit in a native integer type.
+        field_size = 65521
+        query = ([[1, 2, 3], [4, 5, 6]], [7, 8, 9], [10, 11, 65520])
+
+        # Write the query to a file and map it back.
+        path = tmp_path / "query.bin"
+        path.write_bytes(dump_query(query, field_size))
+        header, array = load_array(map_file(str(path)))
+
+        # The array is a view of the file with one row per vector.
+        assert header.kind == QUERY and header.element_size == element_size(field_size) == 2
+        assert array.shape == (4, 3)
+        assert array[1].tolist() == [4, 5, 6] and array[3, 2] == 65520
@@ -0,0 +1,68 @@
+import pytest
+from sage.arith.misc import random_prime
+
+from src.flpcp import BinaryValidation, NormBoundValidation, RangeValidation
+from src.flpcp.base import parallel_sum_chunk_length, seed_gen
+from src.flpcp.verifier_pool import VerifierPool
+
+
+class TestVerifierPool:
+    def test_verify(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Use each validator with one valid and one invalid message.
+        cases = [
+            (BinaryValidation(input_size=5, field_size=field_size), [1, 0, 1, 0, 1], [1, 0, 2, 0, 1]),
+            (RangeValidation(input_size=3, field_size=field_size, lower=1, upper=4), [1, 2, 4], [0, 2, 4]),
+            (
+                NormBoundValidation(input_size=3, field_size=field_size, norm_bound=4, input_bound=3),
+                [1, 2, 3], [5, 2, 3]
+            ),
+        ]
+
+        for validator, valid, invalid in cases:
+            proofs = [validator.proof_gen(message=valid if i % 3 else invalid) for i in range(7)]
+            query = validator.query_gen()
+
+            # The pool should agree with verifying one by one, in the order of the proofs.
+            with VerifierPool(validator=validator, query=query, max_workers=2, shard_size=3) as pool:
+                results = pool.verify(proofs)
+            assert [result.index for result in results] == list(range(7))
+            assert [result.accepted for result in results] == [bool(i % 3) for i in range(7)]
+            assert all(result.seconds >= 0 for result in results)
+
+            # The workers should expand the same query from its seed.
+            seed = seed_gen()
+            with VerifierPool(validator=validator, query=seed, max_workers=2, shard_size=3) as pool:
+                results = pool.verify(proofs)
+            expected = validator.verify_batch(proofs=proofs, query=validator.query_gen(seed=seed))
+            assert [result.accepted for result in results] == expected
+
+    def test_verify_compact(self):
+        # Sample a field size for this test.
+        field_size = random_prime(2 ** 128 - 1, lbound=2 ** 127)
+
+        # Use a validator with a ParallelSum gadget, which is only verified with compact queries.
+        validator = RangeValidation(
+            input_size=8, field_size=field_size, lower=1, upper=4, chunk_length=parallel_sum_chunk_length(8, 4)
+        )
+        proofs = [validator.proof_gen(message=[1, 2, 3, 4, 4, 3, 2, 1] if i % 3 else [1, 2, 3, 5, 4, 3, 2, 1])
+                  for i in range(7)]
+
+        # The pool should verify with a compact query, and expand a seed to the compact query by default.
+        seed = seed_gen()
+        for query in [validator.query_gen_compact(), seed]:
+            with VerifierPool(validator=validator, query=query, max_workers=2, shard_size=3) as pool:
+                results = pool.verify(proofs)
+            assert [result.accepted for result in results] == [bool(i % 3) for i in range(7)]
+
+        # A dense query is rejected before any worker starts.
+        with pytest.raises(ValueError):
+            VerifierPool(validator=validator, query=seed, max_workers=2, compact=False)
+
+        # A compact query also verifies the proofs of a validator without the gadget.
+        validator = BinaryValidation(input_size=5, field_size=field_size)
+        proofs = [validator.proof_gen(message=[1, 0, 1, 0, 1]), validator.proof_gen(message=[1, 0, 2, 0, 1])]
+        with VerifierPool(validator=validator, query=seed, max_workers=2, compact=True) as pool:
+            assert [result.accepted for result in pool.verify(proofs)] == [True, False]